@@ -0,0 +1,134 @@
+import random
+from itertools import accumulate
+from threading import Lock
+from time import monotonic, sleep
+
+from pydantic import BaseModel
+
+from src.wikipage_fetcher import RateLimiter
+
+
+DEFAULT_SEED = 42
+
+
+class FakePage(BaseModel):
+    """
+    A synthetic page with the attributes of wikipediaapi.WikipediaPage
+    the crawl relies on.
+    """
+    title: str
+    text: str
+    links: dict[str, None]
+
+
+class RateLimitExceededError(Exception):
+    pass
+
+
+class SyntheticCorpus:
+    def __init__(
+        self,
+        number_of_pages: int = 2000,
+        vocabulary_size: int = 50_000,
+        mean_words: int = 1500,
+        mean_links: int = 30,
+        seed: int = DEFAULT_SEED
+    ) -> None:
+        """
+        Generate a reproducible corpus of linked pages.
+
+        Word frequencies follow a Zipf distribution, page lengths a
+        log-normal one around mean_words and links prefer popular pages,
+        so neighbourhoods of pages overlap like on Wikipedia.
+
+        Args:
+            number_of_pages: The number of pages of the corpus.
+            vocabulary_size: The number of distinct words.
+            mean_words: The mean number of words of a page.
+            mean_links: The mean number of links of a page.
+            seed: The seed of the generator.
+        """
+        generator = random.Random(seed)
+        vocabulary = [self._word(generator, rank) for rank in range(vocabulary_size)]
+        word_weights = list(accumulate(1 / (rank + 1) for rank in range(vocabulary_size)))
+        self.titles = [f"Page {number}" for number in range(number_of_pages)]
+        page_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(number_of_pages)))
+        self.pages: dict[str, FakePage] = {}
+        for title in self.titles:
+            number_of_words = max(1, int(generator.lognormvariate(0, 0.6) * mean_words / 1.2))
+            words = generator.choices(vocabulary, cum_weights=word_weights, k=number_of_words)
+            sentences = [
+                " ".join(words[start:start + 12]).capitalize() + "."
+                for start in range(0, len(words), 12)
+            ]
+            number_of_links = max(0, int(generator.expovariate(1 / mean_links)))
+            links = generator.choices(self.titles, cum_weights=page_weights, k=number_of_links)
+            self.pages[title] = FakePage(
+                title=title,
+                text=" ".join(sentences),
+                links=dict.fromkeys(link for link in links if link != title)
+            )
+
+    @staticmethod
+    def _word(generator: random.Random, rank: int) -> str:
+        length = 2 + min(12, int(generator.expovariate(1 / 5)))
+        return "".join(generator.choices("abcdefghijklmnopqrstuvwxyz", k=length)) + str(rank % 7 or "")
+
+    @property
+    def text_bytes(self) -> int:
+        return sum(len(page.text.encode()) for page in self.pages.values())
+
+
+class FakeWikiPageFetcher:
+    def __init__(
+        self,
+        corpus: SyntheticCorpus,
+        latency: float = 0.0,
+        max_requests_per_second: float | None = None,
+        reject_over_limit: bool = False
+    ) -> None:
+        """
+        An in-process page fetcher serving a synthetic corpus.
+
+        Args:
+            corpus: The corpus to serve.
+            latency: Simulated upstream latency of every request in seconds.
+            max_requests_per_second: Simulated upstream rate limit.
+            reject_over_limit: Reject requests over the rate limit like
+                               Wikipedia does, instead of throttling them.
+        """
+        self._corpus = corpus
+        self._latency = latency
+        self._max_requests_per_second = max_requests_per_second
+        self._reject_over_limit = reject_over_limit
+        self._rate_limiter = (
+            RateLimiter(max_requests_per_second)
+            if max_requests_per_second and not reject_over_limit else None
+        )
+        self._window_started_at = monotonic()
+        self._window_requests = 0
+        self._lock = Lock()
+        self.requests = 0
+        self.rejected = 0
+
+    def fetch_page(self, page_name: str) -> FakePage | None:
+        with self._lock:
+            self.requests += 1
+        if self._rate_limiter:
+            self._rate_limiter.acquire()
+        elif self._reject_over_limit and self._max_requests_per_second:
+            self._check_rate_limit()
+        if self._latency:
+            sleep(self._latency)
+        return self._corpus.pages.get(page_name)
+
+    def _check_rate_limit(self) -> None:
+        with self._lock:
+            now = monotonic()
+            if now - self._window_started_at >= 1:
+                self._window_started_at = now
+                self._window_requests = 0
+            self._window_requests += 1
+            if self._window_requests > self._max_requests_per_second:
+                self.rejected += 1
+                raise RateLimitExceededError("429 Too Many Requests")
@@ -0,0 +1,242 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from time import monotonic, perf_counter
+
+import httpx
+import structlog
+
+from benchmarks.fake_wiki import DEFAULT_SEED, FakeWikiPageFetcher, SyntheticCorpus
+
+
+DEFAULT_PORT = 8765
+SAMPLE_INTERVAL = 0.25
+WORKLOADS = {
+    "mixed": {"word_frequency_depth_0": 4, "word_frequency_depth_1": 3, "keywords_depth_1": 2, "keywords_batch": 1},
+    "light": {"word_frequency_depth_0": 1},
+    "heavy": {"word_frequency_depth_1": 1, "keywords_depth_1": 1},
+}
+
+
+def serve(port: int, corpus: SyntheticCorpus, latency: float, workers: int, cache_path: str | None) -> None:
+    """
+    Run the API backed by a stub upstream serving the corpus, in one
+    process or with the production server and several workers.
+    """
+    import uvicorn
+
+    import src.api as api
+    from src.app import run_production
+    from src.cache import SqliteWikiPageCache, WikiPageCache
+    from src.components import PageHandlers, USE_CACHE, create_fetch_executor
+    from src.page_handler import PageHandler
+
+    fetcher = FakeWikiPageFetcher(corpus, latency=latency)
+    api.fetch_executor = create_fetch_executor()
+    api.page_handlers = PageHandlers(lambda language: PageHandler(
+        fetcher,
+        SqliteWikiPageCache(cache_path, ttl=60 * 60) if cache_path else WikiPageCache(ttl=60 * 60),
+        use_cache=USE_CACHE,
+        language=language,
+        fetch_executor=api.fetch_executor
+    ))
+    if workers > 1:
+        run_production(api.app, {"bind": f"127.0.0.1:{port}", "workers": workers, "loglevel": "warning"})
+    else:
+        uvicorn.run(api.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def read_process_stats(pid: int) -> dict[str, int] | None:
+    """
+    Read the thread count and resident memory of a process and its
+    worker processes from /proc.
+    """
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="utf-8") as children:
+            pids = [pid, *map(int, children.read().split())]
+    except OSError:
+        return None
+    stats = {"processes": 0, "threads": 0, "rss_bytes": 0}
+    for process_id in pids:
+        try:
+            with open(f"/proc/{process_id}/status", encoding="utf-8") as status:
+                fields = dict(line.split(":", 1) for line in status if ":" in line)
+        except OSError:
+            continue
+        stats["processes"] += 1
+        stats["threads"] += int(fields["Threads"])
+        stats["rss_bytes"] += int(fields["VmRSS"].split()[0]) * 1024
+    return stats
+
+
+def percentile(values: list[float], percent: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def build_request(operation: str, generator: random.Random, titles: list[str]) -> tuple[str, str, dict]:
+    article = generator.choice(titles)
+    if operation == "word_frequency_depth_0":
+        return "GET", "/word-frequency", {"params": {"article": article, "depth": 0}}
+    if operation == "word_frequency_depth_1":
+        return "GET", "/word-frequency", {"params": {"article": article, "depth": 1}}
+    if operation == "keywords_depth_1":
+        return "POST", "/keywords", {"json": {"article": article, "depth": 1, "percentile": 1}}
+    return "POST", "/keywords/batch", {"json": {"requests": [
+        {"article": generator.choice(titles), "depth": 1} for _ in range(3)
+    ]}}
+
+
+async def run_load(
+    base_url: str,
+    titles: list[str],
+    workload: dict[str, int],
+    concurrency: int,
+    duration: float,
+    server_pid: int | None
+) -> dict:
+    latencies: dict[str, list[float]] = defaultdict(list)
+    statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    samples: list[dict[str, int]] = []
+    deadline = monotonic() + duration
+    operations, weights = list(workload), list(workload.values())
+
+    async def client_loop(client: httpx.AsyncClient, seed: int) -> None:
+        generator = random.Random(seed)
+        while monotonic() < deadline:
+            operation = generator.choices(operations, weights)[0]
+            method, path, arguments = build_request(operation, generator, titles)
+            started_at = perf_counter()
+            try:
+                response = await client.request(method, path, **arguments)
+                await response.aread()
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            latencies[operation].append(perf_counter() - started_at)
+            statuses[operation][status] += 1
+
+    async def sample_server() -> None:
+        while monotonic() < deadline:
+            if server_pid and (stats := read_process_stats(server_pid)):
+                samples.append(stats)
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        started_at = perf_counter()
+        await asyncio.gather(
+            sample_server(),
+            *(client_loop(client, DEFAULT_SEED + number) for number in range(concurrency))
+        )
+        elapsed = perf_counter() - started_at
+
+    def summarize(values: list[float], codes: dict[int, int]) -> dict:
+        return {
+            "requests": len(values),
+            "throughput_per_second": len(values) / elapsed,
+            "p50_seconds": percentile(values, 50),
+            "p95_seconds": percentile(values, 95),
+            "p99_seconds": percentile(values, 99),
+            "max_seconds": max(values, default=None),
+            "status_codes": {str(code): count for code, count in sorted(codes.items())},
+        }
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    all_statuses: dict[int, int] = defaultdict(int)
+    for codes in statuses.values():
+        for code, count in codes.items():
+            all_statuses[code] += count
+    return {
+        "elapsed_seconds": elapsed,
+        "total": summarize(all_latencies, all_statuses),
+        "operations": {
+            operation: summarize(latencies[operation], statuses[operation])
+            for operation in latencies
+        },
+        "server": {
+            "processes": samples[-1]["processes"] if samples else None,
+            "max_threads": max((sample["threads"] for sample in samples), default=None),
+            "max_rss_bytes": max((sample["rss_bytes"] for sample in samples), default=None),
+            "last_rss_bytes": samples[-1]["rss_bytes"] if samples else None,
+        },
+    }
+
+
+async def wait_until_ready(base_url: str, timeout: float) -> None:
+    """
+    Wait until /ready answers 200, so the measurement starts after the
+    page handlers are built and the cache snapshot is restored.
+    """
+    deadline = monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                if (await client.get("/ready")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            if monotonic() > deadline:
+                raise TimeoutError(f"The API server was not ready within {timeout} seconds")
+            await asyncio.sleep(0.1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the API against a stub upstream")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--mean-words", type=int, default=1500)
+    parser.add_argument("--mean-links", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated upstream latency in seconds")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes of the server")
+    parser.add_argument("--cache-path", help="SQLite page cache shared by the workers, in memory if not set")
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--output", help="Results JSON file, printed to stdout if not set")
+    args = parser.parse_args()
+
+    corpus_arguments = ["--pages", str(args.pages), "--mean-words", str(args.mean_words), "--mean-links", str(args.mean_links)]
+    if args.serve:
+        structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(30))
+        corpus = SyntheticCorpus(args.pages, mean_words=args.mean_words, mean_links=args.mean_links)
+        serve(args.port, corpus, args.latency, args.workers, args.cache_path)
+        sys.exit()
+
+    # The server must start with multiprocess metrics, they are set up before prometheus_client is imported
+    metrics_directory = tempfile.mkdtemp(prefix="prometheus-") if args.workers > 1 else None
+    server_environment = os.environ | ({"PROMETHEUS_MULTIPROC_DIR": metrics_directory} if metrics_directory else {})
+    server = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.load_test", "--serve",
+        "--port", str(args.port), "--latency", str(args.latency), "--workers", str(args.workers),
+        *(["--cache-path", args.cache_path] if args.cache_path else []), *corpus_arguments
+    ], env=server_environment)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        asyncio.run(wait_until_ready(base_url, timeout=300))
+        titles = [f"Page {number}" for number in range(args.pages)]
+        results = asyncio.run(run_load(
+            base_url, titles, WORKLOADS[args.workload], args.concurrency, args.duration, server.pid
+        ))
+    finally:
+        server.terminate()
+        server.wait()
+        if metrics_directory:
+            shutil.rmtree(metrics_directory, ignore_errors=True)
+    results["parameters"] = vars(args) | {"serve": None}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
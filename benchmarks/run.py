@@ -0,0 +1,376 @@
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from threading import Event, Thread
+from time import perf_counter, sleep
+from typing import Callable
+
+import structlog
+
+from benchmarks.fake_wiki import FakeWikiPageFetcher, SyntheticCorpus
+from src.cache import WikiPageCache
+from src.components import PageHandlers
+from src.distributed import CrawlCoordinator, CrawlWorker, InMemoryQueueBackend
+from src.models import WikiPageInfo
+from src.page_handler import PageHandler
+from src.word_frequency_calculator import WordFrequencyCalculator
+
+
+ROOT_PAGE = "Page 0"
+DEFAULT_REPEAT = 3
+DEFAULT_NODE_REQUESTS_PER_SECOND = 500
+DISTRIBUTED_NODES = (1, 2, 4)
+STARTUP_TIMEOUT = 60.0
+REPOSITORY_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(function: Callable[[], object], repeat: int) -> dict[str, float]:
+    """
+    Run a function repeatedly and measure its best and mean wall time,
+    then once more under tracemalloc to measure its peak memory.
+    """
+    durations = []
+    for _ in range(repeat):
+        started_at = perf_counter()
+        function()
+        durations.append(perf_counter() - started_at)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "best_seconds": min(durations),
+        "mean_seconds": sum(durations) / len(durations),
+        "peak_memory_bytes": peak,
+    }
+
+
+def benchmark_calculator(corpus: SyntheticCorpus, repeat: int) -> dict:
+    texts = [page.text for page in corpus.pages.values()]
+
+    def tokenize() -> None:
+        for text in texts:
+            WordFrequencyCalculator.calculate_word_frequency(text)
+
+    result = measure(tokenize, repeat)
+    result["megabytes_per_second"] = corpus.text_bytes / 1e6 / result["best_seconds"]
+    result["pages_per_second"] = len(texts) / result["best_seconds"]
+    return result
+
+
+def create_page_handler(fetcher: FakeWikiPageFetcher, use_cache: bool) -> PageHandler:
+    return PageHandler(fetcher, WikiPageCache(ttl=60 * 60), use_cache=use_cache)
+
+
+def benchmark_page_handler(
+    corpus: SyntheticCorpus,
+    depth: int,
+    repeat: int,
+    latency: float,
+    warm_cache: bool = False,
+    approximate: bool = False,
+    compact_visited: bool = False
+) -> dict:
+    WikiPageCache._cache.clear()
+    fetcher = FakeWikiPageFetcher(corpus, latency=latency)
+    page_handler = create_page_handler(fetcher, use_cache=warm_cache)
+    if warm_cache:
+        page_handler.calculate_word_frequency(ROOT_PAGE, depth)
+    requests_before = fetcher.requests
+    result = measure(
+        lambda: page_handler.calculate_word_frequency(
+            ROOT_PAGE, depth, approximate=approximate, compact_visited=compact_visited
+        ),
+        repeat
+    )
+    pages = (fetcher.requests - requests_before) // (repeat + 1)
+    state = page_handler.start_crawl(ROOT_PAGE, depth, compact_visited=compact_visited)
+    page_handler.continue_crawl(state)
+    result["pages"] = state.number_of_fetched_pages
+    result["upstream_requests_per_run"] = pages
+    result["pages_per_second"] = state.number_of_fetched_pages / result["best_seconds"]
+    WikiPageCache._cache.clear()
+    return result
+
+
+def benchmark_distributed(
+    corpus: SyntheticCorpus,
+    depth: int,
+    repeat: int,
+    latency: float,
+    nodes: int,
+    node_requests_per_second: float
+) -> dict:
+    """
+    Crawl with the levels sharded over in-process workers, each with its
+    own rate limited upstream like a node with its own egress IP.
+    """
+    queue_backend = InMemoryQueueBackend()
+    stop = Event()
+    threads = []
+    for shard in range(nodes):
+        fetcher = FakeWikiPageFetcher(
+            corpus, latency=latency, max_requests_per_second=node_requests_per_second
+        )
+        worker = CrawlWorker(create_page_handler(fetcher, use_cache=False), queue_backend, [shard])
+        threads.append(Thread(target=worker.run, args=(stop,)))
+        threads[-1].start()
+    page_handler = PageHandler(
+        FakeWikiPageFetcher(corpus, latency=latency),
+        WikiPageCache(ttl=60 * 60),
+        use_cache=False,
+        crawl_coordinator=CrawlCoordinator(queue_backend, nodes)
+    )
+    try:
+        result = measure(lambda: page_handler.calculate_word_frequency(ROOT_PAGE, depth), repeat)
+        state = page_handler.continue_crawl(page_handler.start_crawl(ROOT_PAGE, depth))
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    result["pages"] = len(state.fetched_pages)
+    result["pages_per_second"] = len(state.fetched_pages) / result["best_seconds"]
+    return result
+
+
+def benchmark_cache(corpus: SyntheticCorpus, repeat: int) -> dict:
+    WikiPageCache._cache.clear()
+    cache = WikiPageCache(ttl=60 * 60)
+    page_info = WikiPageInfo(page_name=ROOT_PAGE, world_freqs={"word": 1}, links=[])
+    keys = [f"en:{title}" for title in corpus.titles]
+
+    def set_and_get() -> None:
+        for key in keys:
+            cache.set(key, page_info)
+        for key in keys:
+            cache.get(key)
+
+    result = measure(set_and_get, repeat)
+    result["operations_per_second"] = 2 * len(keys) / result["best_seconds"]
+    WikiPageCache._cache.clear()
+    return result
+
+
+def benchmark_endpoints(corpus: SyntheticCorpus, depth: int, repeat: int, latency: float) -> dict:
+    from fastapi.testclient import TestClient
+
+    import src.api as api
+
+    WikiPageCache._cache.clear()
+    page_handler = create_page_handler(FakeWikiPageFetcher(corpus, latency=latency), use_cache=True)
+    page_handlers, api.page_handlers = api.page_handlers, PageHandlers(lambda language: page_handler)
+    client = TestClient(api.app)
+    results = {}
+    try:
+        for name, call in {
+            "get_word_frequency": lambda: client.get(
+                "/word-frequency", params={"article": ROOT_PAGE, "depth": depth}
+            ),
+            "post_keywords": lambda: client.post(
+                "/keywords", json={"article": ROOT_PAGE, "depth": depth, "percentile": 1}
+            ),
+            "post_keywords_batch": lambda: client.post(
+                "/keywords/batch",
+                json={"requests": [{"article": title, "depth": depth} for title in corpus.titles[:5]]}
+            ),
+        }.items():
+            assert call().status_code == 200
+            results[name] = measure(call, repeat)
+            results[name]["requests_per_second"] = 1 / results[name]["best_seconds"]
+    finally:
+        api.page_handlers = page_handlers
+        WikiPageCache._cache.clear()
+    return results
+
+
+def measure_import(module: str) -> float:
+    """
+    The wall time of importing a module in a fresh interpreter.
+    """
+    output = subprocess.run(
+        [
+            sys.executable, "-c",
+            f"from time import perf_counter; started_at = perf_counter(); import {module}; "
+            "print(perf_counter() - started_at)"
+        ],
+        cwd=REPOSITORY_PATH, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_time_to_ready(environment: dict[str, str]) -> float:
+    """
+    The wall time from spawning the API server until /ready answers 200.
+    """
+    with socket.socket() as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        port = free_socket.getsockname()[1]
+    started_at = perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPOSITORY_PATH, env={**os.environ, **environment},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while perf_counter() - started_at < STARTUP_TIMEOUT:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1) as response:
+                    if response.status == 200:
+                        return perf_counter() - started_at
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            if server.poll() is not None:
+                raise RuntimeError(f"The API server exited with {server.returncode}")
+            sleep(0.01)
+        raise TimeoutError(f"The API server was not ready within {STARTUP_TIMEOUT} seconds")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def benchmark_startup(corpus: SyntheticCorpus, depth: int, repeat: int) -> dict:
+    """
+    Measure the import time of the API and its time to ready, cold and
+    restoring a cache snapshot of a crawl.
+    """
+    WikiPageCache._cache.clear()
+    create_page_handler(FakeWikiPageFetcher(corpus), use_cache=True).calculate_word_frequency(ROOT_PAGE, depth)
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, "cache-snapshot.jsonl.gz")
+        snapshot_entries = WikiPageCache(ttl=60 * 60).save_snapshot(snapshot_path)
+        WikiPageCache._cache.clear()
+        cold = [measure_time_to_ready({}) for _ in range(repeat)]
+        # The server saves the snapshot again on shutdown, CACHE_TTL keeps its entries live.
+        warm = [
+            measure_time_to_ready({"CACHE_SNAPSHOT_PATH": snapshot_path, "USE_CACHE": "true"})
+            for _ in range(repeat)
+        ]
+    return {
+        "import_seconds": min(measure_import("src.api") for _ in range(repeat)),
+        "time_to_ready_seconds": min(cold),
+        "time_to_ready_with_snapshot_seconds": min(warm),
+        "snapshot_entries": snapshot_entries,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    number_of_pages: int,
+    mean_words: int,
+    mean_links: int,
+    max_depth: int,
+    repeat: int,
+    latency: float,
+    node_requests_per_second: float = DEFAULT_NODE_REQUESTS_PER_SECOND,
+    slow_benchmarks: bool = True
+) -> dict:
+    """
+    Run the benchmark suite on a synthetic corpus.
+
+    Args:
+        slow_benchmarks: Run the distributed crawls, throttled by the node
+                         rate limits, and the startup, which starts API
+                         servers in subprocesses.
+
+    Returns:
+        The machine-readable results with the environment they ran in.
+    """
+    started_at = perf_counter()
+    corpus = SyntheticCorpus(
+        number_of_pages=number_of_pages, mean_words=mean_words, mean_links=mean_links
+    )
+    corpus_seconds = perf_counter() - started_at
+    benchmarks: dict[str, dict] = {
+        "word_frequency_calculator": benchmark_calculator(corpus, repeat),
+        "cache": benchmark_cache(corpus, repeat),
+    }
+    for depth in range(max_depth + 1):
+        benchmarks[f"page_handler_depth_{depth}"] = benchmark_page_handler(
+            corpus, depth, repeat, latency
+        )
+    benchmarks[f"page_handler_depth_{max_depth}_warm_cache"] = benchmark_page_handler(
+        corpus, max_depth, repeat, latency, warm_cache=True
+    )
+    benchmarks[f"page_handler_depth_{max_depth}_approximate"] = benchmark_page_handler(
+        corpus, max_depth, repeat, latency, approximate=True
+    )
+    benchmarks[f"page_handler_depth_{max_depth}_compact_visited"] = benchmark_page_handler(
+        corpus, max_depth, repeat, latency, compact_visited=True
+    )
+    if slow_benchmarks:
+        distributed_depth = min(max_depth, 2)
+        for nodes in DISTRIBUTED_NODES:
+            benchmarks[f"distributed_depth_{distributed_depth}_{nodes}_nodes"] = benchmark_distributed(
+                corpus, distributed_depth, repeat, latency, nodes, node_requests_per_second
+            )
+    benchmarks["endpoints"] = benchmark_endpoints(corpus, min(max_depth, 1), repeat, latency)
+    if slow_benchmarks:
+        benchmarks["startup"] = benchmark_startup(corpus, min(max_depth, 1), repeat)
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "parameters": {
+            "pages": number_of_pages,
+            "mean_words": mean_words,
+            "mean_links": mean_links,
+            "max_depth": max_depth,
+            "repeat": repeat,
+            "latency_seconds": latency,
+            "node_requests_per_second": node_requests_per_second,
+            "slow_benchmarks": slow_benchmarks,
+            "max_fetching_threads": PageHandler.MAX_THREADS,
+        },
+        "corpus": {"text_bytes": corpus.text_bytes, "generation_seconds": corpus_seconds},
+        "benchmarks": benchmarks,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the word frequency benchmark suite")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--mean-words", type=int, default=1500)
+    parser.add_argument("--mean-links", type=int, default=30)
+    parser.add_argument("--max-depth", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated upstream latency in seconds")
+    parser.add_argument(
+        "--node-requests-per-second", type=float, default=DEFAULT_NODE_REQUESTS_PER_SECOND,
+        help="Upstream rate limit of every node of the distributed crawl"
+    )
+    parser.add_argument(
+        "--skip-slow", action="store_true",
+        help="Skip the distributed crawls and the startup, which starts API servers"
+    )
+    parser.add_argument("--output", help="Results JSON file, printed to stdout if not set")
+    args = parser.parse_args()
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    results = run_benchmarks(
+        args.pages, args.mean_words, args.mean_links, args.max_depth, args.repeat, args.latency,
+        args.node_requests_per_second, slow_benchmarks=not args.skip_slow
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
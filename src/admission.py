@@ -0,0 +1,95 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import structlog
+
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+DEFAULT_MAX_QUEUED_REQUESTS = 32
+DEFAULT_QUEUE_TIMEOUT = 30.0
+
+
+class AdmissionRejectedError(Exception):
+    pass
+
+
+class AdmissionController:
+    """
+    Bounds the number of calculations running at once. Requests over the
+    limit wait in a bounded queue and are rejected when the queue is full
+    or their wait times out, so the server load stays bounded no matter
+    how many requests arrive.
+    """
+    MAX_CONCURRENT_REQUESTS = int(os.environ.get(
+        "MAX_CONCURRENT_REQUESTS", DEFAULT_MAX_CONCURRENT_REQUESTS)
+    )
+    MAX_QUEUED_REQUESTS = int(os.environ.get(
+        "MAX_QUEUED_REQUESTS", DEFAULT_MAX_QUEUED_REQUESTS)
+    )
+    QUEUE_TIMEOUT = float(os.environ.get("QUEUE_TIMEOUT", DEFAULT_QUEUE_TIMEOUT))
+
+    def __init__(
+        self,
+        max_concurrent: int | None = None,
+        max_queued: int | None = None,
+        queue_timeout: float | None = None
+    ) -> None:
+        """
+        Args:
+            max_concurrent: The number of calculations running at once.
+            max_queued: The number of requests waiting to run.
+            queue_timeout: The maximum wait of a request in seconds.
+        """
+        self._max_concurrent = max_concurrent or self.MAX_CONCURRENT_REQUESTS
+        self._max_queued = self.MAX_QUEUED_REQUESTS if max_queued is None else max_queued
+        self._queue_timeout = queue_timeout or self.QUEUE_TIMEOUT
+        self._semaphore = asyncio.Semaphore(self._max_concurrent)
+        self._running = 0
+        self._queued = 0
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    async def acquire(self) -> None:
+        """
+        Wait for a free slot, must be paired with release.
+
+        Raises:
+            AdmissionRejectedError: If the queue is full or the wait timed out.
+        """
+        if self._running + self._queued >= self._max_concurrent + self._max_queued:
+            logger.warning("Request rejected, queue is full", queued=self._queued)
+            raise AdmissionRejectedError("Too many requests in the queue")
+        self._queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self._queue_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Request rejected, queue timeout", timeout=self._queue_timeout)
+            raise AdmissionRejectedError("Timed out waiting in the queue")
+        finally:
+            self._queued -= 1
+        self._running += 1
+
+    def release(self) -> None:
+        self._running -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """
+        Run the body in a free slot.
+        """
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
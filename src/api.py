@@ -1,36 +1,185 @@
+import asyncio
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from threading import Event
+from time import perf_counter
+from typing import AsyncIterator, Generator, Iterator
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+import anyio
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import structlog
-import wikipediaapi
 
-from src.cache import WikiPageCache
-from src.models import RequestPost
-from src.page_handler import PageHandler, RootPageNotFoundError
-from src.wikipage_fetcher import WikiPageFetcher
+from src import metrics
+from src.admission import AdmissionController, AdmissionRejectedError
+from src.components import (
+    CACHE_PATH,
+    CACHE_SNAPSHOT_PATH,
+    PageHandlers,
+    USE_CACHE,
+    UnsupportedLanguageError,
+    WIKI_LANGUAGES,
+    WIKI_PRELOAD_LANGUAGES,
+    create_fetch_executor,
+    create_page_cache,
+    create_page_handler,
+)
+from src.models import RequestBatch, RequestPost
+from src.page_handler import RootPageNotFoundError
+from src.visited import ScalableBloomFilter
+from src.word_frequency_calculator import DEFAULT_LANGUAGE
 
 
 logger = structlog.get_logger(__name__)
 
+fetch_executor: ThreadPoolExecutor | None = None
+page_handlers: PageHandlers | None = None
+admission = AdmissionController()
+OVERLOADED_HEADERS = {"Retry-After": "1"}
+VISITED_FALSE_POSITIVE_RATE_HEADER = "X-Visited-False-Positive-Rate"
+
+
+def get_page_handlers() -> PageHandlers:
+    """
+    Get the PageHandlers, creating them and the shared fetching pool on
+    first use. The PageHandler of a language is created on its first
+    request.
+    """
+    global fetch_executor, page_handlers
+    if page_handlers is None:
+        fetch_executor = create_fetch_executor()
+        page_handlers = PageHandlers(
+            partial(create_page_handler, fetch_executor=fetch_executor),
+            languages=WIKI_LANGUAGES
+        )
+    return page_handlers
+
+
+def restore_cache_snapshot() -> None:
+    """
+    Restore the cache snapshot of CACHE_SNAPSHOT_PATH, if any.
+    """
+    if USE_CACHE and CACHE_SNAPSHOT_PATH and os.path.exists(CACHE_SNAPSHOT_PATH):
+        restored = create_page_cache().restore_snapshot(CACHE_SNAPSHOT_PATH)
+        logger.info("Restored cache snapshot", path=CACHE_SNAPSHOT_PATH, number_of_entries=restored)
+
+
+def save_cache_snapshot() -> None:
+    """
+    Save the cache to the snapshot of CACHE_SNAPSHOT_PATH, if set. A cache
+    in process memory holds the pages of its own worker only, the pages
+    saved by the other workers are kept.
+    """
+    if USE_CACHE and CACHE_SNAPSHOT_PATH:
+        saved = create_page_cache().save_snapshot(CACHE_SNAPSHOT_PATH, merge=not CACHE_PATH)
+        logger.info("Saved cache snapshot", path=CACHE_SNAPSHOT_PATH, number_of_entries=saved)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Build the components of the preloaded languages and restore the cache
+    snapshot before the API reports ready, save the snapshot on shutdown.
+    Under the production server with the SQLite cache the snapshot is
+    restored and saved once by the master process instead of by every
+    worker.
+    """
+    started_at = perf_counter()
+    app.state.ready = False
+    manage_snapshot = not getattr(app.state, "cache_snapshot_by_server", False)
+    if manage_snapshot:
+        await run_in_threadpool(restore_cache_snapshot)
+    for language in WIKI_PRELOAD_LANGUAGES:
+        await run_in_threadpool(get_page_handlers().get, language)
+    app.state.ready = True
+    logger.info("API ready", seconds=round(perf_counter() - started_at, 3))
+    yield
+    app.state.ready = False
+    if manage_snapshot:
+        await run_in_threadpool(save_cache_snapshot)
+    if fetch_executor:
+        fetch_executor.shutdown(wait=False, cancel_futures=True)
+
+
 app = FastAPI(
     title="Word Frequency API",
     description="A REST API for calculating word frequencies from Wikipedia pages",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-DEFAULT_CACHE_TTL = 60 * 60 * 24
-CACHE_TTL = int(os.environ.get("CACHE_TTL", 60 * 60 * 24))
-USE_CACHE = os.environ.get("USE_CACHE", "true").lower() == "true"
-
-wiki_api = wikipediaapi.Wikipedia('Api-User-Agent', 'en')
-wiki_fetcher = WikiPageFetcher(wiki_api=wiki_api)
-wikipage_cache = WikiPageCache(ttl=CACHE_TTL)
-page_handler = PageHandler(
-    wikipage_fetcher=wiki_fetcher,
-    wikipage_cache=wikipage_cache,
-    use_cache=USE_CACHE
-)
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse holding an admission slot. The slot is released
+    however the response ends, also when the client disconnects before
+    the body iterator started.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()
+            admission.release()
+
+
+async def iterate_until_stopped(iterator: Iterator[str], stop: Event) -> AsyncIterator[str]:
+    """
+    Iterate a blocking iterator in the threadpool. When the iteration
+    is cancelled or closed, the iterator is asked to stop through the
+    event and its running step is waited for, so no thread keeps working
+    for a finished request.
+    """
+    try:
+        while True:
+            step = asyncio.ensure_future(run_in_threadpool(next, iterator, None))
+            try:
+                item = await asyncio.shield(step)
+            except asyncio.CancelledError:
+                stop.set()
+                with anyio.CancelScope(shield=True):
+                    await step
+                raise
+            if item is None:
+                return
+            yield item
+    finally:
+        stop.set()
+        # No step is running here, the iterator is suspended or done.
+        if isinstance(iterator, Generator):
+            iterator.close()
+
+
+def visited_headers(compact_visited: bool) -> dict[str, str] | None:
+    """
+    Report the false positive rate of the visited pages of compact crawls.
+    """
+    if not compact_visited:
+        return None
+    return {VISITED_FALSE_POSITIVE_RATE_HEADER: str(ScalableBloomFilter.ERROR_RATE)}
+
+
+async def server_timing(request: Request, call_next):
+    """
+    Report the per-stage durations of the request in a Server-Timing header,
+    omitted if the request recorded no stage. The headers are sent before
+    the body of a streaming response runs, so streamed stages, e.g. those
+    of /keywords/batch, are not reported.
+    """
+    timings = metrics.start_request_timings()
+    response = await call_next(request)
+    if value := timings.server_timing():
+        response.headers["Server-Timing"] = value
+    return response
+
+
+if metrics.SERVER_TIMING:
+    app.middleware("http")(server_timing)
 
 
 @app.get("/")
@@ -49,34 +198,73 @@ async def root_head():
     return {"status": "OK", "message": "Word Frequency API is running"}
 
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness endpoint that returns 200 OK once the components are built
+    and the cache snapshot is restored, 503 before and during shutdown
+    """
+    if not getattr(app.state, "ready", False):
+        raise HTTPException(status_code=503, detail="Not ready")
+    return {"status": "ready"}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus metrics endpoint
+    """
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    content, content_type = metrics.render()
+    return Response(content=content, media_type=content_type)
+
+
 @app.get("/word-frequency")
-async def get_word_frequency(article: str, depth: int):
+async def get_word_frequency(
+    article: str,
+    depth: int,
+    lang: str = DEFAULT_LANGUAGE,
+    approximate: bool = False,
+    compact_visited: bool = False
+):
     """
     GET endpoint for calculating word frequencies
 
     Args:
         article: str, name of the article
         depth: int, depth of the look-up
+        lang: str, language code of the Wikipedia
+        approximate: bool, estimate the counts of the top words in bounded memory
+        compact_visited: bool, keep the visited pages in a Bloom filter, its
+                         false positive rate is reported in a header
 
     Returns:
         Dictionary containing word frequencies with count and percentage
     """
     try:
-        logger.info("Processing word frequency request", article=article, depth=depth)
+        logger.info("Processing word frequency request", article=article, depth=depth, lang=lang)
 
-        result = page_handler.calculate_word_frequency(
-            page_name=article,
-            depth=depth
-        )
+        page_handler = await run_in_threadpool(get_page_handlers().get, lang)
+        async with admission.admit():
+            result = await run_in_threadpool(
+                page_handler.calculate_word_frequency,
+                page_name=article,
+                depth=depth,
+                approximate=approximate,
+                compact_visited=compact_visited
+            )
         logger.info(
             "Word frequency calculation completed",
             article=article,
             word_count=len(result)
         )
-        return JSONResponse(
-            status_code=200,
-            content=result
-        )
+        with metrics.stage("serialize"):
+            return JSONResponse(
+                status_code=200,
+                content=result,
+                headers=visited_headers(compact_visited)
+            )
 
     except RootPageNotFoundError as error:
         logger.error(
@@ -86,6 +274,14 @@ async def get_word_frequency(article: str, depth: int):
         )
         raise HTTPException(status_code=404, detail=f"Article '{article}' not found")
 
+    except UnsupportedLanguageError as error:
+        logger.error("Unsupported language", lang=lang, error=str(error))
+        raise HTTPException(status_code=400, detail=f"Language '{lang}' is not supported")
+
+    except AdmissionRejectedError as error:
+        logger.warning("Request rejected", article=article, error=str(error))
+        raise HTTPException(status_code=503, detail=str(error), headers=OVERLOADED_HEADERS)
+
     except Exception as error:
         logger.error(
             "Unexpected error while calculating word frequency",
@@ -111,22 +307,30 @@ async def post_keywords(request: RequestPost):
             "Processing keywords request",
             article=request.article,
             depth=request.depth,
+            lang=request.lang,
         )
-        result: dict[str, dict[str, int | float]] = page_handler.calculate_word_frequency(
-            page_name=request.article,
-            depth=request.depth,
-            ignore_list=request.ignore_list,
-            percentile=request.percentile
-        )
+        page_handler = await run_in_threadpool(get_page_handlers().get, request.lang)
+        async with admission.admit():
+            result: dict[str, dict[str, int | float]] = await run_in_threadpool(
+                page_handler.calculate_word_frequency,
+                page_name=request.article,
+                depth=request.depth,
+                ignore_list=request.ignore_list,
+                percentile=request.percentile,
+                approximate=request.approximate,
+                compact_visited=request.compact_visited
+            )
         logger.info(
             "Keywords calculation completed",
             article=request.article,
             word_count=len(result)
         )
-        return JSONResponse(
-            status_code=200,
-            content=result
-        )
+        with metrics.stage("serialize"):
+            return JSONResponse(
+                status_code=200,
+                content=result,
+                headers=visited_headers(request.compact_visited)
+            )
     except RootPageNotFoundError as error:
         logger.error(
             "Root page not found",
@@ -134,6 +338,12 @@ async def post_keywords(request: RequestPost):
             error=str(error)
         )
         raise HTTPException(status_code=404, detail=f"Article '{request.article}' not found")
+    except UnsupportedLanguageError as error:
+        logger.error("Unsupported language", lang=request.lang, error=str(error))
+        raise HTTPException(status_code=400, detail=f"Language '{request.lang}' is not supported")
+    except AdmissionRejectedError as error:
+        logger.warning("Request rejected", article=request.article, error=str(error))
+        raise HTTPException(status_code=503, detail=str(error), headers=OVERLOADED_HEADERS)
     except Exception as error:
         logger.error(
             "Error calculating keywords",
@@ -141,3 +351,64 @@ async def post_keywords(request: RequestPost):
             error=str(error)
         )
         raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@app.post("/keywords/batch")
+async def post_keywords_batch(request: RequestBatch):
+    """
+    POST endpoint for calculating word frequencies of many articles at once.
+    Pages shared by the articles of the same language are fetched only once.
+
+    Args:
+        request: RequestBatch model containing a list of RequestPost items
+
+    Returns:
+        Newline delimited JSON, one line per article streamed as it finishes,
+        with the word frequencies or the error of the article
+    """
+    logger.info("Processing keywords batch request", number_of_articles=len(request.requests))
+    requests_by_lang: dict[str, list[RequestPost]] = {}
+    for item in request.requests:
+        requests_by_lang.setdefault(item.lang, []).append(item)
+    try:
+        batches = [
+            (await run_in_threadpool(get_page_handlers().get, lang), items)
+            for lang, items in requests_by_lang.items()
+        ]
+    except UnsupportedLanguageError as error:
+        logger.error("Unsupported language", error=str(error))
+        raise HTTPException(status_code=400, detail=str(error))
+    try:
+        await admission.acquire()
+    except AdmissionRejectedError as error:
+        logger.warning("Request rejected", error=str(error))
+        raise HTTPException(status_code=503, detail=str(error), headers=OVERLOADED_HEADERS)
+    stop = Event()
+
+    def stream_results() -> Iterator[str]:
+        try:
+            results = (
+                item_result for page_handler, items in batches
+                for item_result in page_handler.calculate_word_frequency_batch(items, stop)
+            )
+            for item, result in results:
+                line = {"article": item.article, "depth": item.depth, "lang": item.lang}
+                if isinstance(result, RootPageNotFoundError):
+                    line |= {"status": 404, "detail": f"Article '{item.article}' not found"}
+                else:
+                    line |= {"status": 200, "result": result}
+                with metrics.stage("serialize"):
+                    payload = json.dumps(line) + "\n"
+                yield payload
+        except Exception as error:
+            logger.error("Error calculating keywords batch", error=str(error))
+            yield json.dumps({"status": 500, "detail": "Internal server error"}) + "\n"
+        logger.info("Keywords batch calculation completed", number_of_articles=len(request.requests))
+
+    try:
+        return AdmittedStreamingResponse(
+            iterate_until_stopped(stream_results(), stop), media_type="application/x-ndjson"
+        )
+    except Exception:
+        admission.release()
+        raise
@@ -1,12 +1,102 @@
 import os
+import shutil
+import tempfile
+
 import uvicorn
 
 DEFAULT_PORT = 8000
+DEFAULT_GRACEFUL_SHUTDOWN_TIMEOUT = 30
+ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+PORT = int(os.getenv("PORT", DEFAULT_PORT))
+WORKERS = int(os.getenv("WORKERS", os.cpu_count() or 1))
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv(
+    "GRACEFUL_SHUTDOWN_TIMEOUT", DEFAULT_GRACEFUL_SHUTDOWN_TIMEOUT)
+)
+
+
+def prepare_multiprocess_metrics() -> None:
+    """
+    Make the worker processes share their Prometheus metrics through
+    files, so /metrics reports the whole server whichever worker serves it.
+    Must run before prometheus_client is imported.
+    """
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+    else:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+
+
+def run_production(app=None, options: dict | None = None) -> None:
+    """
+    Serve the API with a gunicorn master and uvicorn worker processes.
+    The app is loaded once in the master before the workers are forked,
+    so configuration errors fail fast and the workers share its memory.
+    On SIGTERM the workers stop accepting connections and finish their
+    in-flight requests for up to GRACEFUL_SHUTDOWN_TIMEOUT seconds, then
+    the master saves the cache snapshot of the SQLite cache.
+
+    Args:
+        app: The ASGI app, src.api:app by default. A given app must be
+             imported after prepare_multiprocess_metrics.
+        options: Gunicorn settings overriding the defaults.
+    """
+    from gunicorn.app.base import BaseApplication
+
+    if app is None:
+        prepare_multiprocess_metrics()
+        from src.api import app
+
+    from src.api import restore_cache_snapshot, save_cache_snapshot
+    from src.components import CACHE_PATH
+
+    def on_starting(server) -> None:
+        restore_cache_snapshot()
+
+    def on_exit(server) -> None:
+        save_cache_snapshot()
+
+    # The master restores the snapshot of the SQLite cache before forking
+    # the workers and saves it once after they stopped. A cache in process
+    # memory is only filled by its worker, every worker restores and saves
+    # its own.
+    snapshot_hooks = {}
+    if CACHE_PATH:
+        app.state.cache_snapshot_by_server = True
+        snapshot_hooks = {"on_starting": on_starting, "on_exit": on_exit}
+
+    def child_exit(server, worker) -> None:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+    class ProductionServer(BaseApplication):
+        def load_config(self) -> None:
+            for key, value in {
+                "bind": f"0.0.0.0:{PORT}",
+                "workers": WORKERS,
+                "worker_class": "uvicorn.workers.UvicornWorker",
+                "preload_app": True,
+                "graceful_timeout": GRACEFUL_SHUTDOWN_TIMEOUT,
+                "child_exit": child_exit,
+                **snapshot_hooks,
+                **(options or {}),
+            }.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    ProductionServer().run()
+
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "api:app",
-        host="0.0.0.0",
-        port=os.getenv("PORT", DEFAULT_PORT),
-        reload=True
-    )
+    if ENVIRONMENT == "production":
+        run_production()
+    else:
+        uvicorn.run(
+            "api:app",
+            host="0.0.0.0",
+            port=PORT,
+            reload=True
+        )
@@ -0,0 +1,288 @@
+import argparse
+import hashlib
+import json
+import os
+from time import perf_counter
+
+import structlog
+
+from src.models import CrawlCounts, CrawlState, RequestPost
+from src.page_handler import PageHandler, RootPageNotFoundError
+from src.word_frequency_calculator import DEFAULT_LANGUAGE
+
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_CHECKPOINT_PAGES = 500
+RESULTS_FILE = "results.ndjson"
+COUNTS_SUFFIX = ".counts.ndjson"
+PARQUET_BATCH_SIZE = 100_000
+
+
+def _job_key(article: str, depth: int, lang: str) -> str:
+    return hashlib.sha1(f"{lang}\t{article}\t{depth}".encode()).hexdigest()
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        page_handler: PageHandler,
+        output_path: str,
+        checkpoint_dir: str | None = None,
+        checkpoint_pages: int = DEFAULT_CHECKPOINT_PAGES
+    ) -> None:
+        """
+        Initialize the BatchRunner.
+
+        Args:
+            page_handler: The PageHandler running the crawls.
+            output_path: Path of the results, NDJSON or Parquet
+                         by the .parquet extension.
+            checkpoint_dir: Directory of the crawl checkpoints,
+                            defaults to next to the output.
+            checkpoint_pages: The number of fetched pages between checkpoints.
+        """
+        self._page_handler = page_handler
+        self._output_path = output_path
+        self._checkpoint_dir = checkpoint_dir or output_path + ".checkpoints"
+        self._checkpoint_pages = checkpoint_pages
+        self._parquet = output_path.endswith(".parquet")
+        self._results_path = (
+            os.path.join(self._checkpoint_dir, RESULTS_FILE)
+            if self._parquet else output_path
+        )
+        self._started_at = perf_counter()
+        self._fetched_pages = 0
+
+    def run(self, requests: list[RequestPost]) -> None:
+        """
+        Run the crawls of the requests not finished by a previous run,
+        resuming interrupted crawls from their checkpoints. With a term
+        index the requests are merged from it and not checkpointed.
+
+        Args:
+            requests: The requests to run.
+        """
+        os.makedirs(self._checkpoint_dir, exist_ok=True)
+        finished = self._load_finished()
+        pending = [
+            request for request in requests
+            if (request.lang, request.article, request.depth) not in finished
+        ]
+        logger.info(
+            "Starting batch run",
+            number_of_requests=len(requests),
+            already_finished=len(requests) - len(pending)
+        )
+        self._started_at = perf_counter()
+        self._fetched_pages = 0
+        with open(self._results_path, "a", encoding="utf-8") as results:
+            for number, request in enumerate(pending, start=1):
+                line = {"article": request.article, "depth": request.depth, "lang": request.lang}
+                try:
+                    line |= {"status": 200, "result": self._calculate(request)}
+                except RootPageNotFoundError:
+                    line |= {"status": 404, "detail": f"Article '{request.article}' not found"}
+                results.write(json.dumps(line) + "\n")
+                results.flush()
+                os.fsync(results.fileno())
+                self._remove_checkpoint(request)
+                logger.info(
+                    "Request finished",
+                    article=request.article,
+                    depth=request.depth,
+                    progress=f"{number}/{len(pending)}",
+                    **self._throughput()
+                )
+        if self._parquet:
+            write_parquet(self._results_path, self._output_path)
+        logger.info("Batch run completed", **self._throughput())
+
+    def _calculate(self, request: RequestPost) -> dict[str, dict[str, int | float]]:
+        if self._page_handler.uses_term_index:
+            return self._page_handler.calculate_word_frequency(
+                request.article, request.depth, request.ignore_list, request.percentile
+            )
+        state = self._run_crawl(request)
+        return self._page_handler.build_result(state, request.ignore_list, request.percentile)
+
+    def _run_crawl(self, request: RequestPost) -> CrawlState:
+        state = self._load_checkpoint(request)
+        if state is None:
+            state = self._page_handler.start_crawl(request.article, request.depth)
+            self._fetched_pages += 1
+            self._save_checkpoint(request, state)
+        else:
+            logger.info(
+                "Resuming crawl",
+                article=request.article,
+                depth=request.depth,
+                level=state.level,
+                fetched_pages=len(state.fetched_pages)
+            )
+        fetched_before = len(state.fetched_pages)
+        saved_level = state.level
+        state.counts_journal = []
+
+        def checkpoint(state: CrawlState) -> None:
+            # The state is saved whole once per level, the counts of the
+            # pages fetched within a level are appended to it.
+            nonlocal fetched_before, saved_level
+            self._fetched_pages += len(state.fetched_pages) - fetched_before
+            fetched_before = len(state.fetched_pages)
+            if state.level != saved_level:
+                self._save_checkpoint(request, state)
+                saved_level = state.level
+            else:
+                self._append_counts(request, state.counts_journal)
+            state.counts_journal.clear()
+            logger.info(
+                "Crawl checkpoint",
+                article=request.article,
+                level=state.level,
+                **self._throughput()
+            )
+
+        return self._page_handler.continue_crawl(state, checkpoint, self._checkpoint_pages)
+
+    def _throughput(self) -> dict[str, int | float]:
+        elapsed = perf_counter() - self._started_at
+        return {
+            "fetched_pages": self._fetched_pages,
+            "pages_per_second": round(self._fetched_pages / elapsed, 2) if elapsed else 0.0
+        }
+
+    def _checkpoint_path(self, request: RequestPost) -> str:
+        return os.path.join(
+            self._checkpoint_dir, _job_key(request.article, request.depth, request.lang) + ".json"
+        )
+
+    def _save_checkpoint(self, request: RequestPost, state: CrawlState) -> None:
+        path = self._checkpoint_path(request)
+        with open(path + ".tmp", "w", encoding="utf-8") as checkpoint_file:
+            checkpoint_file.write(state.model_dump_json())
+        os.replace(path + ".tmp", path)
+        # Counts of earlier levels are in the saved state, and are skipped
+        # by their level if the run stops before they are removed.
+        if os.path.exists(path + COUNTS_SUFFIX):
+            os.remove(path + COUNTS_SUFFIX)
+
+    def _append_counts(self, request: RequestPost, counts_journal: list[CrawlCounts]) -> None:
+        if not counts_journal:
+            return
+        with open(self._checkpoint_path(request) + COUNTS_SUFFIX, "a", encoding="utf-8") as counts_file:
+            counts_file.writelines(counts.model_dump_json() + "\n" for counts in counts_journal)
+            counts_file.flush()
+            os.fsync(counts_file.fileno())
+
+    def _load_checkpoint(self, request: RequestPost) -> CrawlState | None:
+        path = self._checkpoint_path(request)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as checkpoint_file:
+            state = CrawlState.model_validate_json(checkpoint_file.read())
+        if os.path.exists(path + COUNTS_SUFFIX):
+            with open(path + COUNTS_SUFFIX, "rb+") as counts_file:
+                content = counts_file.read()
+                # Drop a line partially written by an interrupted run.
+                counts_file.truncate(content.rfind(b"\n") + 1)
+            for line in content[:content.rfind(b"\n") + 1].splitlines():
+                counts = CrawlCounts.model_validate_json(line)
+                if counts.level == state.level:
+                    state.add_counts(counts.page_names, counts.world_freqs, counts.total_hits, counts.links)
+        return state
+
+    def _remove_checkpoint(self, request: RequestPost) -> None:
+        path = self._checkpoint_path(request)
+        for checkpoint_path in (path, path + COUNTS_SUFFIX):
+            if os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+
+    def _load_finished(self) -> set[tuple[str, str, int]]:
+        if not os.path.exists(self._results_path):
+            return set()
+        with open(self._results_path, "rb+") as results:
+            content = results.read()
+            # Drop a line partially written by an interrupted run.
+            results.truncate(content.rfind(b"\n") + 1)
+        finished = set()
+        for line in content[:content.rfind(b"\n") + 1].splitlines():
+            result = json.loads(line)
+            # Lines written before languages were recorded are English.
+            finished.add((result.get("lang", DEFAULT_LANGUAGE), result["article"], result["depth"]))
+        return finished
+
+
+def write_parquet(results_path: str, output_path: str) -> None:
+    """
+    Convert NDJSON results to a Parquet file with one row per
+    language, article, depth and word.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise RuntimeError("Parquet output requires the pyarrow package") from error
+    schema = pa.schema([
+        ("lang", pa.string()),
+        ("article", pa.string()),
+        ("depth", pa.int32()),
+        ("word", pa.string()),
+        ("count", pa.int64()),
+        ("percent", pa.float64()),
+    ])
+    columns: dict[str, list] = {name: [] for name in schema.names}
+    with pq.ParquetWriter(output_path, schema) as writer, open(results_path, encoding="utf-8") as results:
+        for line in results:
+            result = json.loads(line)
+            for word, stats in result.get("result", {}).items():
+                columns["lang"].append(result.get("lang", DEFAULT_LANGUAGE))
+                columns["article"].append(result["article"])
+                columns["depth"].append(result["depth"])
+                columns["word"].append(word)
+                columns["count"].append(stats["count"])
+                columns["percent"].append(stats["percent"])
+            if len(columns["word"]) >= PARQUET_BATCH_SIZE:
+                writer.write_table(pa.table(columns, schema=schema))
+                columns = {name: [] for name in schema.names}
+        writer.write_table(pa.table(columns, schema=schema))
+
+
+if __name__ == "__main__":
+    from src.components import create_page_handler
+
+    parser = argparse.ArgumentParser(
+        description="Calculate word frequencies of many articles with resumable checkpoints"
+    )
+    parser.add_argument("articles", nargs="*")
+    parser.add_argument("--articles-file", help="File with one article per line")
+    parser.add_argument("--depths", type=int, nargs="+", default=[1])
+    parser.add_argument("--output", required=True, help="Results file, .ndjson or .parquet")
+    parser.add_argument("--checkpoint-dir")
+    parser.add_argument("--checkpoint-pages", type=int, default=DEFAULT_CHECKPOINT_PAGES)
+    parser.add_argument("--ignore-list", nargs="*")
+    parser.add_argument("--percentile", type=int)
+    parser.add_argument("--lang", default=DEFAULT_LANGUAGE)
+    args = parser.parse_args()
+
+    articles = list(args.articles)
+    if args.articles_file:
+        with open(args.articles_file, encoding="utf-8") as articles_file:
+            articles.extend(line.strip() for line in articles_file if line.strip())
+    requests = [
+        RequestPost(
+            article=article,
+            depth=depth,
+            lang=args.lang,
+            ignore_list=args.ignore_list,
+            percentile=args.percentile
+        )
+        for article in articles for depth in args.depths
+    ]
+    runner = BatchRunner(
+        create_page_handler(args.lang), args.output, args.checkpoint_dir, args.checkpoint_pages
+    )
+    try:
+        runner.run(requests)
+    except KeyboardInterrupt:
+        logger.warning("Batch run interrupted, run the same command again to resume")
@@ -1,8 +1,17 @@
+import contextlib
+import fcntl
+import glob
+import gzip
+import json
+import os
+import sqlite3
+from threading import local
 from time import time
 
 from pydantic import BaseModel
-from typing import ClassVar, TypeVar, Generic
+from typing import IO, ClassVar, Generic, Iterable, Iterator, TypeVar
 
+from src import metrics
 from src.models import WikiPageInfo
 
 CachedDataTyep = TypeVar("CachedDataTyep")
@@ -24,11 +33,15 @@ class Cache(Generic[CachedDataTyep]):
 
     def get(self, key: str) -> CachedDataTyep | None:
         if key not in self._cache:
+            metrics.count_cache_request("miss")
             return None
         entry = self._cache[key]
         if time() - entry.timestamp > self._ttl:
             del self._cache[key]
+            metrics.count_cache_request("miss")
+            metrics.count_cache_eviction()
             return None
+        metrics.count_cache_request("hit")
         return entry.data
 
     def set(self, key: str, data: CachedDataTyep) -> None:
@@ -38,6 +51,29 @@ class Cache(Generic[CachedDataTyep]):
         )
 
 
+def _open_snapshot(path: str, mode: str, compressed: bool) -> IO[str]:
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _remove_stale_snapshots(path: str) -> None:
+    """
+    Remove the temporary snapshot files left by killed processes.
+    """
+    for temporary_path in glob.glob(f"{glob.escape(path)}.*.tmp"):
+        pid = temporary_path[len(path) + 1:-len(".tmp")]
+        if not pid.isdigit():
+            continue
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temporary_path)
+        except PermissionError:
+            pass
+
+
 class WikiPageCache(Cache[WikiPageInfo]):
     """
     A cache for Wikipedia pages.
@@ -45,3 +81,157 @@ class WikiPageCache(Cache[WikiPageInfo]):
 
     def __init__(self, ttl: int) -> None:
         super().__init__(ttl)
+
+    def save_snapshot(self, path: str, merge: bool = False) -> int:
+        """
+        Write the live entries to a JSON lines snapshot file, gzipped if
+        the path ends with .gz. The file is replaced atomically, the
+        processes saving the same snapshot take turns through a lock file
+        next to it.
+
+        Args:
+            path: The path of the snapshot.
+            merge: Keep the live entries of the existing snapshot, e.g.
+                   saved by processes with their own caches.
+
+        Returns:
+            The number of saved entries.
+        """
+        with open(path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if merge and os.path.exists(path):
+                self.restore_snapshot(path)
+            return self._write_snapshot(path)
+
+    def _write_snapshot(self, path: str) -> int:
+        _remove_stale_snapshots(path)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        number_of_entries = 0
+        try:
+            with _open_snapshot(temporary_path, "w", path.endswith(".gz")) as snapshot:
+                for key, page_info, timestamp in self._entries():
+                    snapshot.write(json.dumps({
+                        "key": key,
+                        "timestamp": timestamp,
+                        "page": page_info.model_dump(mode="json"),
+                    }) + "\n")
+                    number_of_entries += 1
+            os.replace(temporary_path, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temporary_path)
+            raise
+        return number_of_entries
+
+    def restore_snapshot(self, path: str) -> int:
+        """
+        Load the entries of a snapshot file still within the ttl, with
+        their original timestamps.
+
+        Returns:
+            The number of restored entries.
+        """
+        now = time()
+
+        def entries() -> Iterator[tuple[str, WikiPageInfo, float]]:
+            with _open_snapshot(path, "r", path.endswith(".gz")) as snapshot:
+                for line in snapshot:
+                    entry = json.loads(line)
+                    if now - entry["timestamp"] <= self._ttl:
+                        yield entry["key"], WikiPageInfo.model_validate(entry["page"]), entry["timestamp"]
+
+        return self._restore_entries(entries())
+
+    def _entries(self) -> Iterator[tuple[str, WikiPageInfo, float]]:
+        now = time()
+        for key, entry in list(self._cache.items()):
+            if now - entry.timestamp <= self._ttl:
+                yield key, entry.data, entry.timestamp
+
+    def _restore_entries(self, entries: Iterable[tuple[str, WikiPageInfo, float]]) -> int:
+        number_of_entries = 0
+        for key, page_info, timestamp in entries:
+            if key not in self._cache:
+                self._cache[key] = self.CacheItem(data=page_info, timestamp=timestamp)
+                number_of_entries += 1
+        return number_of_entries
+
+
+class SqliteWikiPageCache(WikiPageCache):
+    """
+    A cache for Wikipedia pages kept in a local SQLite database instead
+    of process memory, so all the worker processes of the server share
+    one copy of the pages and a page fetched by one of them is a hit
+    for the others.
+    """
+
+    def __init__(self, path: str, ttl: int) -> None:
+        """
+        Args:
+            path: The path of the database file, created if missing.
+            ttl: The ttl of the entries in seconds.
+        """
+        super().__init__(ttl)
+        self._path = path
+        self._local = local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS pages "
+            "(key TEXT PRIMARY KEY, data TEXT NOT NULL, timestamp REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Get the connection of the current thread, connections are not
+        shared between threads nor inherited by forked processes.
+        """
+        if getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return self._local.connection
+
+    def get(self, key: str) -> WikiPageInfo | None:
+        row = self._connection().execute(
+            "SELECT data, timestamp FROM pages WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            metrics.count_cache_request("miss")
+            return None
+        data, timestamp = row
+        if time() - timestamp > self._ttl:
+            self._connection().execute(
+                "DELETE FROM pages WHERE key = ? AND timestamp = ?", (key, timestamp)
+            )
+            metrics.count_cache_request("miss")
+            metrics.count_cache_eviction()
+            return None
+        metrics.count_cache_request("hit")
+        return WikiPageInfo.model_validate_json(data)
+
+    def set(self, key: str, data: WikiPageInfo) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO pages (key, data, timestamp) VALUES (?, ?, ?)",
+            (key, data.model_dump_json(), time())
+        )
+
+    def _entries(self) -> Iterator[tuple[str, WikiPageInfo, float]]:
+        rows = self._connection().execute(
+            "SELECT key, data, timestamp FROM pages WHERE timestamp >= ?", (time() - self._ttl,)
+        )
+        for key, data, timestamp in rows:
+            yield key, WikiPageInfo.model_validate_json(data), timestamp
+
+    def _restore_entries(self, entries: Iterable[tuple[str, WikiPageInfo, float]]) -> int:
+        connection = self._connection()
+        changes_before = connection.total_changes
+        # One transaction, the workers restoring at once insert each entry once.
+        with connection:
+            connection.execute("BEGIN")
+            connection.executemany(
+                "INSERT OR IGNORE INTO pages (key, data, timestamp) VALUES (?, ?, ?)",
+                ((key, page_info.model_dump_json(), timestamp) for key, page_info, timestamp in entries)
+            )
+        return connection.total_changes - changes_before
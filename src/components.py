@@ -0,0 +1,190 @@
+import os
+import re
+from concurrent.futures import Executor, ThreadPoolExecutor
+from threading import Lock
+from typing import Callable
+
+from src.cache import SqliteWikiPageCache, WikiPageCache
+from src.page_handler import PageHandler
+from src.wikipage_fetcher import PageFetcher, RateLimiter, SharedRateLimiter, WikiPageFetcher
+from src.word_frequency_calculator import DEFAULT_LANGUAGE
+
+
+DEFAULT_CACHE_TTL = 60 * 60 * 24
+CACHE_TTL = int(os.environ.get("CACHE_TTL", DEFAULT_CACHE_TTL))
+USE_CACHE = os.environ.get("USE_CACHE", "true").lower() == "true"
+CACHE_PATH = os.environ.get("CACHE_PATH")
+CACHE_SNAPSHOT_PATH = os.environ.get("CACHE_SNAPSHOT_PATH")
+WIKI_DUMP_PATH = os.environ.get("WIKI_DUMP_PATH")
+WIKI_DUMP_STORE = os.environ.get("WIKI_DUMP_STORE")
+TERM_INDEX_PATH = os.environ.get("TERM_INDEX_PATH")
+MAX_REQUESTS_PER_SECOND = float(os.environ.get("MAX_REQUESTS_PER_SECOND", 0))
+RATE_LIMITER_DIR = os.environ.get("RATE_LIMITER_DIR")
+# Every allowed language keeps a PageHandler for the lifetime of the
+# process, so the languages must be listed.
+WIKI_LANGUAGES = {
+    language.strip()
+    for language in os.environ.get("WIKI_LANGUAGES", DEFAULT_LANGUAGE).split(",")
+    if language.strip()
+} or {DEFAULT_LANGUAGE}
+# The other allowed languages are built on their first request.
+WIKI_PRELOAD_LANGUAGES = {
+    language.strip()
+    for language in os.environ.get("WIKI_PRELOAD_LANGUAGES", DEFAULT_LANGUAGE).split(",")
+} & WIKI_LANGUAGES
+CRAWL_QUEUE_URL = os.environ.get("CRAWL_QUEUE_URL")
+CRAWL_SHARDS = int(os.environ.get("CRAWL_SHARDS", 1))
+CRAWL_VISIBILITY_TIMEOUT = float(os.environ.get("CRAWL_VISIBILITY_TIMEOUT", 60))
+LANGUAGE_PATTERN = re.compile(r"^[a-z][a-z-]{1,15}$")
+
+
+class UnsupportedLanguageError(Exception):
+    pass
+
+
+def _language_path(path: str | None, language: str) -> str | None:
+    """
+    Resolve a per-language path. Paths with a {lang} placeholder are
+    formatted with the language, others belong to the default language.
+    """
+    if not path:
+        return None
+    if "{lang}" in path:
+        return path.format(lang=language)
+    return path if language == DEFAULT_LANGUAGE else None
+
+
+def create_page_fetcher(language: str = DEFAULT_LANGUAGE) -> PageFetcher:
+    """
+    Create the page fetcher of a language configured by the environment,
+    a local dump if WIKI_DUMP_PATH or WIKI_DUMP_STORE is set for the
+    language, otherwise live Wikipedia with its own rate limiter and
+    connection pool.
+    """
+    dump_path = _language_path(WIKI_DUMP_PATH, language)
+    dump_store = _language_path(WIKI_DUMP_STORE, language)
+    # Backends are imported on first use to keep the startup fast.
+    if dump_path or dump_store:
+        from src.dump_fetcher import DumpPageFetcher
+
+        if dump_path:
+            return DumpPageFetcher.from_dump(dump_path, dump_store)
+        return DumpPageFetcher(dump_store)
+    import wikipediaapi
+
+    wiki_api = wikipediaapi.Wikipedia('Api-User-Agent', language)
+    return WikiPageFetcher(wiki_api=wiki_api, rate_limiter=create_rate_limiter(language))
+
+
+def create_rate_limiter(language: str = DEFAULT_LANGUAGE) -> RateLimiter | None:
+    """
+    Create the rate limiter of a language configured by the environment,
+    shared by the worker processes through a slot file in RATE_LIMITER_DIR
+    if set, otherwise limiting this process only.
+    """
+    if not MAX_REQUESTS_PER_SECOND:
+        return None
+    if RATE_LIMITER_DIR:
+        os.makedirs(RATE_LIMITER_DIR, exist_ok=True)
+        return SharedRateLimiter(
+            MAX_REQUESTS_PER_SECOND, os.path.join(RATE_LIMITER_DIR, f"{language}.slot")
+        )
+    return RateLimiter(MAX_REQUESTS_PER_SECOND)
+
+
+def create_fetch_executor() -> ThreadPoolExecutor:
+    """
+    Create the server-wide pool of fetching threads shared by all requests
+    and languages, its threads are started on demand.
+    """
+    return ThreadPoolExecutor(
+        max_workers=PageHandler.MAX_THREADS, thread_name_prefix="page-fetch"
+    )
+
+
+def create_page_cache() -> WikiPageCache:
+    """
+    Create the page cache configured by the environment, shared by the
+    worker processes through a SQLite file if CACHE_PATH is set,
+    otherwise in process memory.
+    """
+    if CACHE_PATH:
+        return SqliteWikiPageCache(CACHE_PATH, ttl=CACHE_TTL)
+    return WikiPageCache(ttl=CACHE_TTL)
+
+
+def create_page_handler(
+    language: str = DEFAULT_LANGUAGE,
+    fetch_executor: Executor | None = None
+) -> PageHandler:
+    """
+    Create the PageHandler of a language configured by the environment.
+
+    Args:
+        language: The language of the Wikipedia.
+        fetch_executor: The shared pool of fetching threads, by default
+                        every level of a crawl uses its own pool.
+    """
+    term_index, crawl_coordinator = None, None
+    if term_index_path := _language_path(TERM_INDEX_PATH, language):
+        from src.term_index import TermIndex
+
+        term_index = TermIndex(term_index_path)
+    if CRAWL_QUEUE_URL:
+        from src.distributed import CrawlCoordinator, RedisQueueBackend
+
+        crawl_coordinator = CrawlCoordinator(
+            RedisQueueBackend(CRAWL_QUEUE_URL), CRAWL_SHARDS, language,
+            visibility_timeout=CRAWL_VISIBILITY_TIMEOUT
+        )
+    return PageHandler(
+        wikipage_fetcher=create_page_fetcher(language),
+        wikipage_cache=create_page_cache(),
+        use_cache=USE_CACHE,
+        term_index=term_index,
+        language=language,
+        fetch_executor=fetch_executor,
+        crawl_coordinator=crawl_coordinator
+    )
+
+
+class PageHandlers:
+    """
+    PageHandlers by language, created on first use.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], PageHandler] = create_page_handler,
+        languages: set[str] | None = None
+    ) -> None:
+        """
+        Args:
+            factory: Creates the PageHandler of a language.
+            languages: The allowed languages, any valid language code
+                       is allowed if not set.
+        """
+        self._factory = factory
+        self._languages = languages
+        self._page_handlers: dict[str, PageHandler] = {}
+        self._lock = Lock()
+
+    def get(self, language: str = DEFAULT_LANGUAGE) -> PageHandler:
+        """
+        Get the PageHandler of a language, creating it if needed.
+        Creating a PageHandler may load a dump or a term index, call it
+        from a worker thread in async code.
+
+        Raises:
+            UnsupportedLanguageError: If the language is not allowed.
+        """
+        if page_handler := self._page_handlers.get(language):
+            return page_handler
+        if not LANGUAGE_PATTERN.match(language) or (
+            self._languages and language not in self._languages
+        ):
+            raise UnsupportedLanguageError(f"Language {language} is not supported")
+        with self._lock:
+            if language not in self._page_handlers:
+                self._page_handlers[language] = self._factory(language)
+            return self._page_handlers[language]
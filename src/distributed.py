@@ -0,0 +1,351 @@
+import argparse
+import hashlib
+import os
+import uuid
+from collections import Counter, defaultdict, deque
+from threading import Condition, Event
+from time import monotonic
+from typing import TYPE_CHECKING, Protocol
+
+import structlog
+from pydantic import BaseModel
+
+from src import metrics
+from src.models import CrawlState
+from src.word_frequency_calculator import DEFAULT_LANGUAGE
+
+if TYPE_CHECKING:
+    from src.page_handler import PageHandler
+
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_TASK_SIZE = 100
+DEFAULT_SHARD_TIMEOUT = 300.0
+DEFAULT_VISIBILITY_TIMEOUT = 60.0
+POLL_TIMEOUT = 1.0
+
+
+class ShardTimeoutError(Exception):
+    pass
+
+
+class QueueBackend(Protocol):
+    """
+    A set of named FIFO queues of string messages shared by the
+    coordinator and the workers.
+    """
+
+    def push(self, queue: str, message: str) -> None:
+        ...
+
+    def pop(self, queues: list[str], timeout: float) -> str | None:
+        """
+        Pop the first message of the first non-empty queue, waiting up
+        to timeout seconds for one. Returns None on timeout.
+        """
+        ...
+
+    def delete(self, queue: str) -> None:
+        ...
+
+
+class InMemoryQueueBackend:
+    """
+    Queues of a single process, for workers running as threads
+    and for tests.
+    """
+
+    def __init__(self) -> None:
+        self._queues: dict[str, deque[str]] = defaultdict(deque)
+        self._condition = Condition()
+
+    def push(self, queue: str, message: str) -> None:
+        with self._condition:
+            self._queues[queue].append(message)
+            self._condition.notify_all()
+
+    def pop(self, queues: list[str], timeout: float) -> str | None:
+        deadline = monotonic() + timeout
+        with self._condition:
+            while True:
+                for queue in queues:
+                    if self._queues[queue]:
+                        return self._queues[queue].popleft()
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    def delete(self, queue: str) -> None:
+        with self._condition:
+            self._queues.pop(queue, None)
+
+
+class RedisQueueBackend:
+    """
+    Queues kept in Redis lists, shared by the nodes of a cluster.
+    """
+
+    def __init__(self, url: str) -> None:
+        """
+        Args:
+            url: The Redis URL, e.g. redis://localhost:6379/0.
+        """
+        try:
+            import redis
+        except ImportError as error:
+            raise RuntimeError("The Redis queue backend requires the redis package") from error
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    def push(self, queue: str, message: str) -> None:
+        self._redis.rpush(queue, message)
+
+    def pop(self, queues: list[str], timeout: float) -> str | None:
+        # BLPOP takes whole seconds, 0 would block forever.
+        item = self._redis.blpop(queues, timeout=max(1, round(timeout)))
+        return item[1] if item else None
+
+    def delete(self, queue: str) -> None:
+        self._redis.delete(queue)
+
+
+class ShardTask(BaseModel):
+    """
+    Pages of one shard of a crawl level to fetch and tokenize.
+
+    Args:
+        batch_id: The id of the pages sent together, names their
+                  results queue.
+        task_id: The id of the task, acknowledged by its result.
+        level: The level of the crawl.
+        page_names: The names of the pages to fetch.
+    """
+    batch_id: str
+    task_id: str
+    level: int
+    page_names: list[str]
+
+
+class ShardResult(BaseModel):
+    """
+    Partial counts of the pages of a ShardTask.
+
+    Args:
+        batch_id: The id of the pages sent together.
+        task_id: The id of the task.
+        level: The level of the crawl.
+        fetched_pages: The names of the pages fetched or not found,
+                       pages failed to fetch are missing.
+        world_freqs: The summed word frequencies of the pages.
+        total_hits: The number of words in the pages.
+        links: The links of the pages.
+    """
+    batch_id: str
+    task_id: str
+    level: int
+    fetched_pages: list[str]
+    world_freqs: Counter
+    total_hits: int
+    links: list[str]
+
+
+def shard_of(page_name: str, number_of_shards: int) -> int:
+    """
+    The shard of a page, stable across processes and nodes so a page is
+    always fetched by the same worker and hits its cache.
+    """
+    digest = hashlib.sha1(page_name.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % number_of_shards
+
+
+def task_queue(language: str, shard: int) -> str:
+    return f"crawl:tasks:{language}:{shard}"
+
+
+def result_queue(batch_id: str) -> str:
+    return f"crawl:results:{batch_id}"
+
+
+class CrawlCoordinator:
+    """
+    Distributes the levels of crawls over workers. The pages of a level
+    are hashed onto shard queues, the workers consuming them fetch and
+    tokenize the pages and send back partial counts, which are merged
+    into the crawl state. The state deduplicates the next level. Tasks
+    not answered within the visibility timeout, e.g. lost by a crashed
+    worker, are queued again and the first result of a task is merged.
+    """
+
+    def __init__(
+        self,
+        queue_backend: QueueBackend,
+        number_of_shards: int,
+        language: str = DEFAULT_LANGUAGE,
+        task_size: int = DEFAULT_TASK_SIZE,
+        shard_timeout: float = DEFAULT_SHARD_TIMEOUT,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT
+    ) -> None:
+        """
+        Args:
+            queue_backend: The queues shared with the workers.
+            number_of_shards: The number of shard queues, every shard
+                              must be consumed by a worker.
+            language: The language of the Wikipedia, scopes the queues.
+            task_size: The maximum number of pages of a task.
+            shard_timeout: The maximum wait in seconds for the next result.
+            visibility_timeout: The wait in seconds for the result of a
+                                task before it is queued again.
+        """
+        self._queue_backend = queue_backend
+        self._number_of_shards = number_of_shards
+        self._language = language
+        self._task_size = task_size
+        self._shard_timeout = shard_timeout
+        self._visibility_timeout = visibility_timeout
+
+    def crawl_pages(self, state: CrawlState, page_names: list[str]) -> None:
+        """
+        Fetch pages of the current level of a crawl on the workers and
+        add their counts to the state.
+
+        Raises:
+            ShardTimeoutError: If a worker did not answer in time.
+        """
+        shards: dict[int, list[str]] = defaultdict(list)
+        for page_name in page_names:
+            shards[shard_of(page_name, self._number_of_shards)].append(page_name)
+        batch_id = uuid.uuid4().hex
+        now = monotonic()
+        # The unacknowledged tasks with their queue and redelivery deadline.
+        pending: dict[str, tuple[str, ShardTask, float]] = {}
+        for shard, shard_pages in shards.items():
+            for start in range(0, len(shard_pages), self._task_size):
+                task = ShardTask(
+                    batch_id=batch_id,
+                    task_id=uuid.uuid4().hex,
+                    level=state.level + 1,
+                    page_names=shard_pages[start:start + self._task_size]
+                )
+                queue = task_queue(self._language, shard)
+                self._queue_backend.push(queue, task.model_dump_json())
+                pending[task.task_id] = (queue, task, now + self._visibility_timeout)
+        logger.debug("Distributed level", number_of_shards=len(shards), number_of_tasks=len(pending))
+        try:
+            self._merge_results(state, batch_id, pending)
+        finally:
+            self._queue_backend.delete(result_queue(batch_id))
+
+    def _merge_results(
+        self,
+        state: CrawlState,
+        batch_id: str,
+        pending: dict[str, tuple[str, ShardTask, float]]
+    ) -> None:
+        last_result_at = monotonic()
+        while pending:
+            now = monotonic()
+            if now - last_result_at >= self._shard_timeout:
+                logger.error("Shard timed out", batch_id=batch_id, timeout=self._shard_timeout)
+                raise ShardTimeoutError(f"No shard result within {self._shard_timeout} seconds")
+            for task_id, (queue, task, deadline) in list(pending.items()):
+                if deadline <= now:
+                    logger.warning("Requeueing unacknowledged task", batch_id=batch_id, queue=queue)
+                    self._queue_backend.push(queue, task.model_dump_json())
+                    pending[task_id] = (queue, task, now + self._visibility_timeout)
+            timeout = min(
+                min(deadline for _, _, deadline in pending.values()),
+                last_result_at + self._shard_timeout
+            ) - now
+            message = self._queue_backend.pop([result_queue(batch_id)], max(timeout, 0))
+            if message is None:
+                continue
+            result = ShardResult.model_validate_json(message)
+            # A requeued task may be answered twice, its first result is merged.
+            if pending.pop(result.task_id, None) is None:
+                continue
+            last_result_at = monotonic()
+            with metrics.stage("aggregate"):
+                state.add_counts(result.fetched_pages, result.world_freqs, result.total_hits, result.links)
+
+
+class CrawlWorker:
+    """
+    Fetches and tokenizes the pages of the tasks of its shards with a
+    PageHandler, e.g. one worker per node and egress IP.
+    """
+
+    def __init__(
+        self,
+        page_handler: "PageHandler",
+        queue_backend: QueueBackend,
+        shards: list[int],
+        language: str = DEFAULT_LANGUAGE
+    ) -> None:
+        """
+        Args:
+            page_handler: Fetches the pages, with its own cache and
+                          rate limiter.
+            queue_backend: The queues shared with the coordinators.
+            shards: The shards consumed by the worker.
+            language: The language of the Wikipedia.
+        """
+        self._page_handler = page_handler
+        self._queue_backend = queue_backend
+        self._queues = [task_queue(language, shard) for shard in shards]
+
+    def process_next(self, timeout: float = POLL_TIMEOUT) -> bool:
+        """
+        Process the next task of the shards.
+
+        Returns:
+            False if no task arrived within timeout seconds.
+        """
+        message = self._queue_backend.pop(self._queues, timeout)
+        if message is None:
+            return False
+        task = ShardTask.model_validate_json(message)
+        fetched = self._page_handler.fetch_pages(task.page_names)
+        world_freqs: Counter = Counter()
+        links: set[str] = set()
+        for page_info in fetched.values():
+            if page_info:
+                world_freqs.update(page_info.world_freqs)
+                links.update(page_info.links)
+        result = ShardResult(
+            batch_id=task.batch_id,
+            task_id=task.task_id,
+            level=task.level,
+            fetched_pages=list(fetched),
+            world_freqs=world_freqs,
+            total_hits=world_freqs.total(),
+            links=list(links)
+        )
+        self._queue_backend.push(result_queue(task.batch_id), result.model_dump_json())
+        logger.debug("Processed shard task", level=task.level, number_of_pages=len(fetched))
+        return True
+
+    def run(self, stop: Event | None = None) -> None:
+        """
+        Process tasks until stopped.
+        """
+        logger.info("Crawl worker started", queues=self._queues)
+        while not (stop and stop.is_set()):
+            self.process_next()
+
+
+if __name__ == "__main__":
+    from src.components import create_page_handler
+
+    parser = argparse.ArgumentParser(description="Run a distributed crawl worker")
+    parser.add_argument("--queue-url", default=os.environ.get("CRAWL_QUEUE_URL"), required="CRAWL_QUEUE_URL" not in os.environ, help="Redis URL of the queues")
+    parser.add_argument("--shards", type=int, nargs="+", required=True, help="The shards consumed by the worker")
+    parser.add_argument("--lang", default=DEFAULT_LANGUAGE)
+    args = parser.parse_args()
+
+    CrawlWorker(
+        create_page_handler(args.lang),
+        RedisQueueBackend(args.queue_url),
+        args.shards,
+        args.lang
+    ).run()
@@ -0,0 +1,302 @@
+import argparse
+import bz2
+import contextlib
+import fcntl
+import os
+import re
+import xml.etree.ElementTree as ET
+from typing import IO, Iterator, NamedTuple
+
+import structlog
+from pydantic import BaseModel
+
+
+logger = structlog.get_logger(__name__)
+
+STORE_SUFFIX = ".store.jsonl"
+INDEX_SUFFIX = ".idx"
+LOCK_SUFFIX = ".lock"
+SKIPPED_LINK_NAMESPACES = {"file", "image", "media", "category"}
+
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.S)
+_REF_RE = re.compile(r"<ref[^>]*/>|<ref[^>]*>.*?</ref>", re.S | re.I)
+_TEMPLATE_RE = re.compile(r"\{\{[^{}]*\}\}")
+_TABLE_RE = re.compile(r"\{\|.*?\|\}", re.S)
+_LINK_RE = re.compile(r"\[\[([^\[\]|]*)(?:\|([^\[\]]*))?\]\]")
+_EXTERNAL_LINK_RE = re.compile(r"\[https?://[^\s\]]*\s?([^\]]*)\]")
+_TAG_RE = re.compile(r"<[^>]+>")
+_FORMATTING_RE = re.compile(r"'{2,}|={2,}")
+
+
+class RawPage(NamedTuple):
+    title: str
+    redirect: str | None
+    wikitext: str
+
+
+class DumpPage(BaseModel):
+    """
+    Model for a page read from a local Wikipedia dump. It exposes the same
+    attributes of wikipediaapi.WikipediaPage the crawl relies on.
+
+    Args:
+        title: The title of the page.
+        text: The plain text of the page.
+        links: The titles of the linked pages, keys of the dict.
+        redirect: The title of the target page if the page is a redirect.
+    """
+    title: str
+    text: str
+    links: dict[str, None]
+    redirect: str | None = None
+
+
+def normalize_title(title: str) -> str:
+    """
+    Normalize a page title the way MediaWiki does: underscores are spaces,
+    the first letter is capitalized and the section anchor is dropped.
+    """
+    title = title.split("#", 1)[0].replace("_", " ").strip()
+    return title[:1].upper() + title[1:]
+
+
+def _remove_nested(pattern: re.Pattern, text: str) -> str:
+    while True:
+        cleaned = pattern.sub("", text)
+        if cleaned == text:
+            return cleaned
+        text = cleaned
+
+
+def parse_wikitext(wikitext: str) -> tuple[str, dict[str, None]]:
+    """
+    Convert wikitext to plain text and collect the linked page titles.
+
+    Templates, tables, references and file/category links are dropped,
+    internal links are replaced with their labels.
+
+    Args:
+        wikitext: The raw wikitext of a page.
+
+    Returns:
+        A tuple of the plain text and the links of the page.
+    """
+    links: dict[str, None] = {}
+
+    def replace_link(match: re.Match) -> str:
+        target, label = match.group(1), match.group(2)
+        namespace, _, _ = target.partition(":")
+        if ":" in target and namespace.strip().lower() in SKIPPED_LINK_NAMESPACES:
+            return ""
+        if title := normalize_title(target):
+            links[title] = None
+        return label if label is not None else target
+
+    text = _COMMENT_RE.sub("", wikitext)
+    text = _REF_RE.sub("", text)
+    text = _remove_nested(_TEMPLATE_RE, text)
+    text = _TABLE_RE.sub("", text)
+    while True:
+        replaced = _LINK_RE.sub(replace_link, text)
+        if replaced == text:
+            break
+        text = replaced
+    text = _EXTERNAL_LINK_RE.sub(r"\1", text)
+    text = _TAG_RE.sub("", text)
+    text = _FORMATTING_RE.sub("", text)
+    return text, links
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _open_dump(dump_path: str) -> IO[bytes]:
+    if dump_path.endswith(".bz2"):
+        return bz2.open(dump_path, "rb")
+    return open(dump_path, "rb")
+
+
+def _parse_page_element(element: ET.Element) -> RawPage | None:
+    fields: dict[str, ET.Element] = {}
+    for child in element.iter():
+        fields.setdefault(_local_name(child.tag), child)
+    if (namespace := fields.get("ns")) is not None and namespace.text != "0":
+        return None
+    title = fields["title"].text or ""
+    if (redirect := fields.get("redirect")) is not None:
+        return RawPage(title, normalize_title(redirect.get("title", "")), "")
+    text_element = fields.get("text")
+    wikitext = text_element.text if text_element is not None else ""
+    return RawPage(title, None, wikitext or "")
+
+
+def iter_raw_pages(dump_path: str) -> Iterator[RawPage]:
+    """
+    Stream the article pages of a pages-articles XML dump
+    without parsing their wikitext.
+
+    Args:
+        dump_path: Path of the dump, plain XML or bz2 compressed.
+
+    Returns:
+        An iterator of the raw pages in the main namespace.
+    """
+    with _open_dump(dump_path) as dump:
+        context = ET.iterparse(dump, events=("start", "end"))
+        _, root = next(context)
+        for event, element in context:
+            if event != "end" or _local_name(element.tag) != "page":
+                continue
+            page = _parse_page_element(element)
+            root.clear()
+            if page:
+                yield page
+
+
+def iter_dump_pages(dump_path: str) -> Iterator[DumpPage]:
+    """
+    Stream the article pages of a pages-articles XML dump.
+
+    Args:
+        dump_path: Path of the dump, plain XML or bz2 compressed.
+
+    Returns:
+        An iterator of the pages in the main namespace.
+    """
+    for raw_page in iter_raw_pages(dump_path):
+        if raw_page.redirect is not None:
+            yield DumpPage(
+                title=raw_page.title,
+                text="",
+                links={},
+                redirect=raw_page.redirect
+            )
+            continue
+        text, links = parse_wikitext(raw_page.wikitext)
+        yield DumpPage(title=raw_page.title, text=text, links=links)
+
+
+def build_dump_store(dump_path: str, store_path: str) -> int:
+    """
+    Convert a dump to a local store of JSON lines with an offset index,
+    so pages can be read by title with a single positioned read. The
+    store and the index are written to temporary files and replaced
+    atomically.
+
+    Args:
+        dump_path: Path of the dump, plain XML or bz2 compressed.
+        store_path: Path of the store, the index is written next to it.
+
+    Returns:
+        The number of pages written to the store.
+    """
+    positions: dict[str, tuple[int, int]] = {}
+    redirects: dict[str, str] = {}
+    temporary_store_path = f"{store_path}.{os.getpid()}.tmp"
+    index_path = store_path + INDEX_SUFFIX
+    temporary_index_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_store_path, "wb") as store:
+            for page in iter_dump_pages(dump_path):
+                if page.redirect is not None:
+                    redirects[page.title] = page.redirect
+                    continue
+                line = page.model_dump_json(exclude={"redirect"}).encode() + b"\n"
+                positions[page.title] = (store.tell(), len(line))
+                store.write(line)
+        with open(temporary_index_path, "w", encoding="utf-8") as index:
+            for title, (offset, length) in positions.items():
+                index.write(f"{title}\t{offset}\t{length}\n")
+            for title, target in redirects.items():
+                if target in positions and title not in positions:
+                    offset, length = positions[target]
+                    index.write(f"{title}\t{offset}\t{length}\n")
+        # Readers keep the files they opened, the index is replaced last
+        # as it marks the store as built.
+        os.replace(temporary_store_path, store_path)
+        os.replace(temporary_index_path, index_path)
+    except BaseException:
+        for temporary_path in (temporary_store_path, temporary_index_path):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temporary_path)
+        raise
+    logger.info(
+        "Dump store built",
+        dump=dump_path,
+        store=store_path,
+        pages=len(positions),
+        redirects=len(redirects)
+    )
+    return len(positions)
+
+
+class DumpPageFetcher:
+    def __init__(self, store_path: str) -> None:
+        """
+        Initialize the DumpPageFetcher with a store built by build_dump_store.
+
+        Args:
+            store_path: Path of the store, the index is read from next to it.
+        """
+        self._positions: dict[str, tuple[int, int]] = {}
+        with open(store_path + INDEX_SUFFIX, encoding="utf-8") as index:
+            for line in index:
+                title, offset, length = line.rstrip("\n").split("\t")
+                self._positions[title] = (int(offset), int(length))
+        self._store_fd = os.open(store_path, os.O_RDONLY)
+
+    @classmethod
+    def from_dump(
+        cls,
+        dump_path: str,
+        store_path: str | None = None
+    ) -> "DumpPageFetcher":
+        """
+        Create a DumpPageFetcher for a dump, building its store if missing.
+        The build holds a lock next to the store, so processes starting
+        together build it once and the others wait for it.
+
+        Args:
+            dump_path: Path of the dump, plain XML or bz2 compressed.
+            store_path: Path of the store, defaults to next to the dump.
+        """
+        store_path = store_path or dump_path + STORE_SUFFIX
+        if not os.path.exists(store_path + INDEX_SUFFIX):
+            with open(store_path + LOCK_SUFFIX, "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                if not os.path.exists(store_path + INDEX_SUFFIX):
+                    build_dump_store(dump_path, store_path)
+        return cls(store_path)
+
+    def fetch_page(self, page_name: str) -> DumpPage | None:
+        """
+        Read a page from the local store.
+
+        Args:
+            page_name: The name of the Wikipedia page to fetch.
+
+        Returns:
+            A DumpPage object if the page is in the store, otherwise None.
+        """
+        if not page_name:
+            return None
+        position = self._positions.get(normalize_title(page_name))
+        if position is None:
+            logger.warning("Page does not exist", page=page_name)
+            return None
+        offset, length = position
+        return DumpPage.model_validate_json(os.pread(self._store_fd, length, offset))
+
+    def close(self) -> None:
+        os.close(self._store_fd)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build a local page store from a Wikipedia XML dump"
+    )
+    parser.add_argument("dump_path")
+    parser.add_argument("store_path", nargs="?")
+    args = parser.parse_args()
+    build_dump_store(args.dump_path, args.store_path or args.dump_path + STORE_SUFFIX)
@@ -0,0 +1,157 @@
+import os
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+from typing import ContextManager, Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "false").lower() == "true"
+
+STAGE_DURATION = Histogram(
+    "word_frequency_stage_duration_seconds",
+    "Duration of the stages of the word frequency calculation",
+    ["stage"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+CACHE_REQUESTS = Counter(
+    "word_frequency_cache_requests_total",
+    "Page cache look-ups by result",
+    ["result"],
+)
+CACHE_EVICTIONS = Counter(
+    "word_frequency_cache_evictions_total",
+    "Page cache entries evicted",
+)
+FETCHES_IN_FLIGHT = Gauge(
+    "word_frequency_fetches_in_flight",
+    "Page fetches in progress",
+    multiprocess_mode="livesum",
+)
+PAGES_PER_REQUEST = Histogram(
+    "word_frequency_pages_per_request",
+    "Pages crawled per word frequency calculation",
+    buckets=(1, 10, 50, 100, 500, 1000, 5000, 10000, 50000),
+)
+UPSTREAM_REQUESTS = Counter(
+    "word_frequency_upstream_requests_total",
+    "Upstream page requests by outcome",
+    ["outcome"],
+)
+
+
+class RequestTimings:
+    """
+    The durations of the stages of a single request. Stages running
+    in parallel threads are summed, so they can exceed the wall time.
+    """
+
+    def __init__(self) -> None:
+        self.durations: dict[str, float] = defaultdict(float)
+        self._lock = Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.durations[stage] += seconds
+
+    def server_timing(self) -> str:
+        """
+        Format the durations as a Server-Timing header value.
+        """
+        return ", ".join(
+            f"{stage};dur={seconds * 1000:.1f}"
+            for stage, seconds in self.durations.items()
+        )
+
+
+_request_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def start_request_timings() -> RequestTimings:
+    """
+    Collect the stage durations of the current request.
+    """
+    timings = RequestTimings()
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def _timed_stage(name: str, timings: RequestTimings | None) -> Iterator[None]:
+    started_at = perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = perf_counter() - started_at
+        if METRICS_ENABLED:
+            STAGE_DURATION.labels(name).observe(elapsed)
+        if timings is not None:
+            timings.add(name, elapsed)
+
+
+def stage(name: str) -> ContextManager[None]:
+    """
+    Time a stage of the calculation: fetch, tokenize, aggregate or serialize.
+    """
+    timings = _request_timings.get()
+    if not METRICS_ENABLED and timings is None:
+        return nullcontext()
+    return _timed_stage(name, timings)
+
+
+def fetch_in_flight() -> ContextManager[None]:
+    """
+    Track a page fetch in the in-flight gauge.
+    """
+    if not METRICS_ENABLED:
+        return nullcontext()
+    return FETCHES_IN_FLIGHT.track_inprogress()
+
+
+def count_cache_request(result: str) -> None:
+    if METRICS_ENABLED:
+        CACHE_REQUESTS.labels(result).inc()
+
+
+def count_cache_eviction() -> None:
+    if METRICS_ENABLED:
+        CACHE_EVICTIONS.inc()
+
+
+def count_upstream_request(outcome: str) -> None:
+    if METRICS_ENABLED:
+        UPSTREAM_REQUESTS.labels(outcome).inc()
+
+
+def observe_pages_per_request(number_of_pages: int) -> None:
+    if METRICS_ENABLED:
+        PAGES_PER_REQUEST.observe(number_of_pages)
+
+
+def render() -> tuple[bytes, str]:
+    """
+    Render the metrics in the Prometheus text format, aggregated over
+    all worker processes when the server runs several.
+
+    Returns:
+        The metrics and their content type.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
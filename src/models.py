@@ -1,6 +1,10 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from collections import Counter
 
+from src.sketch import WordSketch
+from src.visited import DiskFrontier, ScalableBloomFilter
+from src.word_frequency_calculator import DEFAULT_LANGUAGE
+
 
 class WikiPageInfo(BaseModel):
     """
@@ -20,8 +24,214 @@ class WikiPageInfo(BaseModel):
 class RequestCommon(BaseModel):
     article: str
     depth: int
+    lang: str = DEFAULT_LANGUAGE
+    approximate: bool = False
+    compact_visited: bool = False
 
 
 class RequestPost(RequestCommon):
     ignore_list: list[str] | None = None
     percentile: int | None = None
+
+
+class RequestBatch(BaseModel):
+    requests: list[RequestPost]
+
+    @field_validator("requests")
+    @classmethod
+    def exact_requests_only(cls, requests: list[RequestPost]) -> list[RequestPost]:
+        # A batch keeps every fetched page to share it between its crawls,
+        # its memory is not bounded by the approximate or compact modes.
+        if any(request.approximate or request.compact_visited for request in requests):
+            raise ValueError("approximate and compact_visited are not supported in batches")
+        return requests
+
+
+class CrawlCounts(BaseModel):
+    """
+    Model for counts added to a crawl state at once.
+
+    Args:
+        level: The level of the crawl the counts were added at.
+        page_names: The names of the pages fetched or not found.
+        world_freqs: The summed word frequencies of the pages.
+        total_hits: The number of words in the pages.
+        links: The links of the pages.
+    """
+    level: int
+    page_names: list[str]
+    world_freqs: Counter
+    total_hits: int
+    links: list[str]
+
+
+class CrawlState(BaseModel):
+    """
+    Model for the state of a crawl from a root page up to a given depth.
+
+    Args:
+        page_name: The name of the root page.
+        depth: The depth of the crawl.
+        level: The last fully fetched level of the crawl.
+        fetched_pages: The names of the already fetched pages.
+        pages_to_fetch: The names of the pages of the current level.
+        next_pages: The links of the fetched pages of the current level.
+        aggregated_frequencies: The word frequencies of the fetched pages.
+        total_hits: The number of words in the fetched pages.
+        word_sketch: The approximate word frequencies of the fetched
+                     pages, kept instead of aggregated_frequencies in
+                     approximate crawls.
+        visited_filter: The hashes of the fetched and queued pages, kept
+                        instead of fetched_pages in compact crawls.
+        next_frontier: The new links of the current level, kept instead
+                       of next_pages in compact crawls.
+        fetched_count: The number of fetched pages of compact crawls.
+        counts_journal: The counts added since the journal was set or
+                        cleared, recorded only when set, e.g. to
+                        checkpoint a level incrementally. Not serialized.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    page_name: str
+    depth: int
+    level: int = 0
+    fetched_pages: set[str] = set()
+    pages_to_fetch: list[str] | DiskFrontier = []
+    next_pages: set[str] = set()
+    aggregated_frequencies: Counter = Counter()
+    total_hits: int = 0
+    word_sketch: WordSketch | None = None
+    visited_filter: ScalableBloomFilter | None = None
+    next_frontier: DiskFrontier | None = None
+    fetched_count: int = 0
+    counts_journal: list[CrawlCounts] | None = Field(default=None, exclude=True)
+
+    @classmethod
+    def start(
+        cls,
+        root_page: WikiPageInfo,
+        depth: int,
+        approximate: bool = False,
+        compact_visited: bool = False
+    ) -> "CrawlState":
+        """
+        Start a crawl from a fetched root page.
+
+        Args:
+            root_page: The fetched root page.
+            depth: The depth of the crawl.
+            approximate: Sets if the word frequencies are estimated in
+                         bounded memory, such crawls can't be serialized.
+            compact_visited: Sets if the visited pages are kept in a Bloom
+                             filter and the frontier is spilled to disk,
+                             such crawls can't be serialized.
+        """
+        state = cls(
+            page_name=root_page.page_name,
+            depth=depth,
+            word_sketch=WordSketch() if approximate else None
+        )
+        if compact_visited:
+            state.visited_filter = ScalableBloomFilter()
+            state.visited_filter.add(root_page.page_name)
+            state.next_frontier = DiskFrontier()
+            state.pages_to_fetch = DiskFrontier([
+                link for link in root_page.links if state.visited_filter.add(link)
+            ])
+        else:
+            # A root page linking to itself is fetched already.
+            state.pages_to_fetch = [link for link in root_page.links if link != root_page.page_name]
+        state.add_counts([root_page.page_name], root_page.world_freqs, root_page.world_freqs.total(), [])
+        return state
+
+    @property
+    def finished(self) -> bool:
+        return self.level >= self.depth
+
+    @property
+    def number_of_fetched_pages(self) -> int:
+        if self.visited_filter is not None:
+            return self.fetched_count
+        return len(self.fetched_pages)
+
+    def add_pages(self, fetched: dict[str, WikiPageInfo | None]) -> None:
+        """
+        Add fetched pages of the current level.
+
+        Args:
+            fetched: The fetched pages by name, None for pages not found.
+                     Pages failed to fetch are missing.
+        """
+        for page_name, page_info in fetched.items():
+            if page_info:
+                self.add_counts(
+                    [page_name], page_info.world_freqs, page_info.world_freqs.total(), page_info.links
+                )
+            else:
+                self.add_counts([page_name], Counter(), 0, [])
+
+    def add_counts(
+        self,
+        page_names: list[str],
+        world_freqs: Counter,
+        total_hits: int,
+        links: list[str]
+    ) -> None:
+        """
+        Add the summed counts of fetched pages of the current level,
+        e.g. a shard of the level fetched by a distributed worker.
+        Links of the last level are not kept.
+
+        Args:
+            page_names: The names of the pages fetched or not found.
+            world_freqs: The summed word frequencies of the pages.
+            total_hits: The number of words in the pages.
+            links: The links of the pages.
+        """
+        keep_links = self.level < self.depth - 1
+        if self.counts_journal is not None:
+            self.counts_journal.append(CrawlCounts(
+                level=self.level,
+                page_names=page_names,
+                world_freqs=world_freqs,
+                total_hits=total_hits,
+                links=links if keep_links else []
+            ))
+        if self.word_sketch is not None:
+            self.word_sketch.update(world_freqs)
+        else:
+            self.aggregated_frequencies.update(world_freqs)
+        self.total_hits += total_hits
+        if self.visited_filter is None:
+            self.fetched_pages.update(page_names)
+            if keep_links:
+                self.next_pages.update(links)
+            return
+        self.fetched_count += len(page_names)
+        if keep_links:
+            for link in links:
+                if self.visited_filter.add(link):
+                    self.next_frontier.append(link)
+
+    def finish_level(self) -> None:
+        """
+        Move to the next level, its pages are the links of the current
+        level not fetched yet.
+        """
+        self.level += 1
+        if self.visited_filter is not None:
+            self.pages_to_fetch.close()
+            self.pages_to_fetch, self.next_frontier = self.next_frontier, DiskFrontier()
+            return
+        self.pages_to_fetch = [
+            page_name for page_name in self.next_pages
+            if page_name not in self.fetched_pages
+        ]
+        self.next_pages = set()
+
+    def advance(self, fetched: dict[str, WikiPageInfo | None]) -> None:
+        """
+        Add the fetched pages of the current level and move to the next one.
+        """
+        self.add_pages(fetched)
+        self.finish_level()
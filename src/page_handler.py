@@ -1,13 +1,22 @@
 import os
 import structlog
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-from wikipediaapi import WikipediaPage
+from collections import Counter
+from itertools import islice
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from contextvars import copy_context
+from threading import Event
 
+from src import metrics
 from src.cache import WikiPageCache
-from src.models import WikiPageInfo
-from src.wikipage_fetcher import WikiPageFetcher
-from src.word_frequency_calculator import WordFrequencyCalculator
+from src.models import CrawlState, RequestPost, WikiPageInfo
+from src.wikipage_fetcher import FetchedPage, PageFetcher
+from src.word_frequency_calculator import DEFAULT_LANGUAGE, WordFrequencyCalculator
+
+if TYPE_CHECKING:
+    from src.distributed import CrawlCoordinator
+    from src.term_index import TermIndex
 
 
 logger = structlog.get_logger(__name__)
@@ -18,35 +27,72 @@ class RootPageNotFoundError(Exception):
 
 
 DEFAULT_MAX_THREADS = 10
+DEFAULT_FRONTIER_CHUNK_SIZE = 1000
 
 
 class PageHandler:
     MAX_THREADS = int(os.environ.get(
         "MAX_FETCHING_THREADS", DEFAULT_MAX_THREADS)
     )
+    FRONTIER_CHUNK_SIZE = int(os.environ.get(
+        "FRONTIER_CHUNK_SIZE", DEFAULT_FRONTIER_CHUNK_SIZE)
+    )
 
     def __init__(
         self,
-        wikipage_fetcher: WikiPageFetcher,
+        wikipage_fetcher: PageFetcher,
         wikipage_cache: WikiPageCache,
-        use_cache: bool
+        use_cache: bool,
+        term_index: "TermIndex | None" = None,
+        language: str = DEFAULT_LANGUAGE,
+        fetch_executor: Executor | None = None,
+        crawl_coordinator: "CrawlCoordinator | None" = None
     ) -> None:
         """
-        Initialize the PageHandler with a WikiPageFetcher.
+        Initialize the PageHandler with a page fetcher.
 
         Args:
-            wikipage_fetcher: A WikiPageFetcher instance.
+            wikipage_fetcher: A page fetcher, e.g. a WikiPageFetcher
+                              or a DumpPageFetcher instance.
+            term_index: A precomputed TermIndex, if set the word
+                        frequencies are merged from it instead of
+                        fetching and tokenizing pages.
+            language: The language of the Wikipedia, scopes the cache
+                      keys and selects the tokenizer.
+            fetch_executor: A shared executor fetching the pages, bounds the
+                            fetching threads of all requests together. By
+                            default every level uses its own thread pool.
+            crawl_coordinator: Distributes the levels after the root page
+                               of single crawls over workers, by default
+                               the pages are fetched locally.
+
+        Raises:
+            ValueError: If the term index was tokenized for another language.
         """
+        if term_index and term_index.language != language:
+            raise ValueError(
+                f"The term index of language {term_index.language} cannot serve language {language}"
+            )
         self._wikipage_fetcher = wikipage_fetcher
         self._cache = wikipage_cache
         self._use_cache = use_cache
+        self._term_index = term_index
+        self._language = language
+        self._fetch_executor = fetch_executor
+        self._crawl_coordinator = crawl_coordinator
+
+    @property
+    def uses_term_index(self) -> bool:
+        return self._term_index is not None
 
     def calculate_word_frequency(
         self,
         page_name: str,
         depth: int,
         ignore_list: list[str] | None = None,
-        percentile: int | None = None
+        percentile: int | None = None,
+        approximate: bool = False,
+        compact_visited: bool = False
     ) -> dict[str, dict[str, int | float]]:
         """
         Calculate the word frequency of a page and its links
@@ -57,37 +103,221 @@ class PageHandler:
             depth: The depth of the page to fetch.
             ignore_list: A list of words to ignore.
             percentile: The percentile limit to use for the word frequency.
+            approximate: Sets if the counts of the top words are estimated
+                         in bounded memory, see WordSketch. Results of
+                         a term index are always exact.
+            compact_visited: Sets if the visited pages are kept as hashes
+                             in a Bloom filter and the frontier is spilled
+                             to disk, a false positive skips a page.
+        """
+        if self._term_index:
+            return self._calculate_from_term_index(
+                page_name, depth, ignore_list, percentile
+            )
+        state = self.continue_crawl(self.start_crawl(page_name, depth, approximate, compact_visited))
+        metrics.observe_pages_per_request(state.number_of_fetched_pages)
+        return self.build_result(state, ignore_list, percentile)
+
+    def start_crawl(
+        self,
+        page_name: str,
+        depth: int,
+        approximate: bool = False,
+        compact_visited: bool = False
+    ) -> CrawlState:
+        """
+        Fetch the root page and start a crawl from it.
+
+        Args:
+            page_name: The name of the root page.
+            depth: The depth of the crawl.
+            approximate: Sets if the word frequencies are estimated.
+            compact_visited: Sets if the visited pages are kept compact.
         """
-        fethed_pages: list[str] = []
-        total_hits = 0
         root_page = self._fetch_page_info(page_name)
         if not root_page:
             logger.warning("Root page not found", page=page_name)
             raise RootPageNotFoundError(f"Root page {page_name} not found")
+        return CrawlState.start(root_page, depth, approximate, compact_visited)
+
+    def continue_crawl(
+        self,
+        state: CrawlState,
+        checkpoint: Callable[[CrawlState], None] | None = None,
+        checkpoint_pages: int | None = None
+    ) -> CrawlState:
+        """
+        Fetch the remaining levels of a crawl.
+
+        Args:
+            state: The state of the crawl, a new or a restored one.
+            checkpoint: Called with the state after every checkpoint_pages
+                        fetched pages and after every level.
+            checkpoint_pages: The number of pages between checkpoints,
+                              by default only levels are checkpointed.
+        """
+        while not state.finished:
+            pages_to_fetch = (
+                page_name for page_name in state.pages_to_fetch
+                if page_name not in state.fetched_pages
+            )
+            logger.debug("Fetching next level", depth=state.level + 1, max_depth=state.depth)
+            logger.debug("Pages to fetch", number_of_pages=len(state.pages_to_fetch))
+            # Compact crawls hold only a chunk of the pages of a level at once.
+            chunk_size = checkpoint_pages or (
+                self.FRONTIER_CHUNK_SIZE if state.visited_filter is not None
+                else len(state.pages_to_fetch) or 1
+            )
+            while chunk := list(islice(pages_to_fetch, chunk_size)):
+                if self._crawl_coordinator:
+                    self._crawl_coordinator.crawl_pages(state, chunk)
+                else:
+                    fetched = self.fetch_pages(chunk)
+                    with metrics.stage("aggregate"):
+                        state.add_pages(fetched)
+                if checkpoint and checkpoint_pages:
+                    checkpoint(state)
+            state.finish_level()
+            if checkpoint:
+                checkpoint(state)
+        return state
+
+    def build_result(
+        self,
+        state: CrawlState,
+        ignore_list: list[str] | None = None,
+        percentile: int | None = None
+    ) -> dict[str, dict[str, int | float]]:
+        """
+        Build the word frequency result of a finished crawl. The counts of
+        approximate crawls are flagged as estimated, with their maximum
+        error: the true count is between count - max_error and count.
+        """
+        with metrics.stage("aggregate"):
+            if state.word_sketch is not None:
+                return self._build_estimated_result(
+                    state.word_sketch.top_words(), state.total_hits, ignore_list, percentile
+                )
+            return self._build_result(
+                state.aggregated_frequencies, state.total_hits, ignore_list, percentile
+            )
+
+    def calculate_word_frequency_batch(
+        self,
+        requests: list[RequestPost],
+        stop: Event | None = None
+    ) -> Iterator[tuple[RequestPost, dict[str, dict[str, int | float]] | RootPageNotFoundError]]:
+        """
+        Calculate the word frequency of several root pages at once.
+
+        The crawls advance level by level together, the union of their
+        pages to fetch is fetched once per level and every page is fetched
+        only once for the whole batch. With a term index the requests are
+        merged from it one by one. Batches are always exact, see
+        RequestBatch.
+
+        Args:
+            requests: The requests to calculate.
+            stop: Stops the remaining crawls before their next level when set,
+                  e.g. when the client of the batch disconnected.
+
+        Returns:
+            An iterator of the requests with their results, or
+            a RootPageNotFoundError, in the order the crawls finish.
+        """
+        if self._term_index:
+            for number_merged, request in enumerate(requests):
+                if stop and stop.is_set():
+                    logger.info("Batch stopped", number_of_crawls=len(requests) - number_merged)
+                    return
+                try:
+                    yield request, self._calculate_from_term_index(
+                        request.article, request.depth, request.ignore_list, request.percentile
+                    )
+                except RootPageNotFoundError as error:
+                    yield request, error
+            return
+        batch_pages: dict[str, WikiPageInfo | None] = {}
+
+        def fetch(page_names: Iterable[str]) -> dict[str, WikiPageInfo | None]:
+            page_names = list(dict.fromkeys(page_names))
+            batch_pages.update(self.fetch_pages(
+                [page_name for page_name in page_names if page_name not in batch_pages]
+            ))
+            return {
+                page_name: batch_pages[page_name]
+                for page_name in page_names if page_name in batch_pages
+            }
+
+        root_pages = fetch(request.article for request in requests)
+        crawls: list[tuple[RequestPost, CrawlState]] = []
+        for request in requests:
+            if not (root_page := root_pages.get(request.article)):
+                logger.warning("Root page not found", page=request.article)
+                yield request, RootPageNotFoundError(f"Root page {request.article} not found")
+                continue
+            crawls.append((request, CrawlState.start(root_page, request.depth)))
+        while crawls:
+            if stop and stop.is_set():
+                logger.info("Batch stopped", number_of_crawls=len(crawls))
+                return
+            logger.debug("Fetching next batch level", number_of_crawls=len(crawls))
+            pages = fetch(
+                page_name for _, state in crawls if not state.finished
+                for page_name in state.pages_to_fetch
+            )
+            running_crawls = []
+            for request, state in crawls:
+                if not state.finished:
+                    with metrics.stage("aggregate"):
+                        state.advance({
+                            page_name: pages[page_name]
+                            for page_name in state.pages_to_fetch if page_name in pages
+                        })
+                if state.finished:
+                    metrics.observe_pages_per_request(state.number_of_fetched_pages)
+                    yield request, self.build_result(
+                        state, request.ignore_list, request.percentile
+                    )
+                else:
+                    running_crawls.append((request, state))
+            crawls = running_crawls
+
+    def fetch_pages(self, page_names: list[str]) -> dict[str, WikiPageInfo | None]:
+        """
+        Fetch pages in parallel.
+
+        Returns:
+            The fetched pages by name, None for pages not found.
+            Pages failed to fetch are missing.
+        """
+        fetched: dict[str, WikiPageInfo | None] = {}
+        if not page_names:
+            return fetched
+        executor_context = (
+            nullcontext(self._fetch_executor) if self._fetch_executor
+            else ThreadPoolExecutor(max_workers=self.MAX_THREADS)
+        )
+        pages = iter(page_names)
+        future_to_page: dict[Future, str] = {}
+        with executor_context as executor:
+
+            def submit(number_of_pages: int) -> None:
+                for page_name in islice(pages, number_of_pages):
+                    future = executor.submit(copy_context().run, self._fetch_page_info, page_name)
+                    future_to_page[future] = page_name
 
-        fethed_pages.append(root_page.page_name)
-        pages_to_fetch: list[str] = root_page.links
-        aggregated_frequencies = root_page.world_freqs
-        total_hits += aggregated_frequencies.total()
-
-        for level in range(1, depth + 1):
-            logger.debug("Fetching next level", depth=level, max_depth=depth)
-            logger.debug("Pages to fetch", number_of_pages=len(pages_to_fetch))
-            with ThreadPoolExecutor(max_workers=self.MAX_THREADS) as executor:
-                future_to_page = {
-                    executor.submit(self._fetch_page_info, page_name): page_name
-                    for page_name in pages_to_fetch
-                }
-                next_pages: list[str] = []
-                for future in as_completed(future_to_page):
-                    page_name = future_to_page[future]
+            # At most MAX_THREADS pages of a request are queued at once, so
+            # requests sharing the executor take turns instead of small
+            # crawls waiting behind the whole level of a deep one.
+            submit(self.MAX_THREADS)
+            while future_to_page:
+                done, _ = wait(future_to_page, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page_name = future_to_page.pop(future)
                     try:
-                        page_info = future.result()
-                        fethed_pages.append(page_name)
+                        fetched[page_name] = page_info = future.result()
                         if page_info:
-                            aggregated_frequencies += page_info.world_freqs
-                            total_hits += page_info.world_freqs.total()
-                            next_pages.extend(page_info.links)
                             logger.debug("Fetched page", page=page_name)
                         else:
                             logger.warning("Page not found", page=page_name)
@@ -95,9 +325,46 @@ class PageHandler:
                         logger.error(
                             "Error fetching page", page=page_name, error=str(e)
                         )
-                        continue
-            next_pages = list(set(next_pages))
-            pages_to_fetch = [page_name for page_name in next_pages if page_name not in fethed_pages]
+                submit(len(done))
+        return fetched
+
+    def _calculate_from_term_index(
+        self,
+        page_name: str,
+        depth: int,
+        ignore_list: list[str] | None,
+        percentile: int | None
+    ) -> dict[str, dict[str, int | float]]:
+        root_id = self._term_index.page_id(page_name)
+        if root_id is None:
+            logger.warning("Root page not found", page=page_name)
+            raise RootPageNotFoundError(f"Root page {page_name} not found")
+        with metrics.stage("aggregate"):
+            word_counts: Counter = Counter()
+            total_hits = self._term_index.add_word_counts(root_id, word_counts)
+            visited = {root_id}
+            pages_to_merge = set(self._term_index.links(root_id)) - visited
+            for level in range(1, depth + 1):
+                logger.debug("Merging next level", depth=level, max_depth=depth)
+                logger.debug("Pages to merge", number_of_pages=len(pages_to_merge))
+                next_pages: set[int] = set()
+                for page_id in pages_to_merge:
+                    total_hits += self._term_index.add_word_counts(page_id, word_counts)
+                    next_pages.update(self._term_index.links(page_id))
+                visited |= pages_to_merge
+                pages_to_merge = next_pages - visited
+            metrics.observe_pages_per_request(len(visited))
+            return self._build_result(
+                self._term_index.words(word_counts), total_hits, ignore_list, percentile
+            )
+
+    @staticmethod
+    def _build_result(
+        aggregated_frequencies: Counter,
+        total_hits: int,
+        ignore_list: list[str] | None,
+        percentile: int | None
+    ) -> dict[str, dict[str, int | float]]:
         result = {name: {"count": count, "percent": count / total_hits * 100} for name, count in aggregated_frequencies.items()}
         if percentile:
             result = {name: stats for name, stats in result.items() if stats["percent"] >= percentile}
@@ -105,19 +372,41 @@ class PageHandler:
             result = {name: stats for name, stats in result.items() if name not in ignore_list}
         return result
 
+    @classmethod
+    def _build_estimated_result(
+        cls,
+        estimates: dict[str, tuple[int, int]],
+        total_hits: int,
+        ignore_list: list[str] | None,
+        percentile: int | None
+    ) -> dict[str, dict[str, int | float]]:
+        result = cls._build_result(
+            Counter({word: count for word, (count, _) in estimates.items()}),
+            total_hits, ignore_list, percentile
+        )
+        for word, stats in result.items():
+            stats["estimated"] = True
+            stats["max_error"] = estimates[word][1]
+        return result
+
     def _fetch_page_info(self, page_name: str) -> WikiPageInfo | None:
+        cache_key = f"{self._language}:{page_name}"
         if self._use_cache:
-            if cached_page_info := self._cache.get(page_name):
+            if cached_page_info := self._cache.get(cache_key):
                 return cached_page_info
-        page: WikipediaPage | None = self._wikipage_fetcher.fetch_page(page_name)
+        with metrics.stage("fetch"), metrics.fetch_in_flight():
+            page: FetchedPage | None = self._wikipage_fetcher.fetch_page(page_name)
+            if page:
+                # Text and links of live pages are read by the fetcher.
+                title, text, links = page.title, page.text, list(page.links.keys())
         if not page:
             logger.warning("Page not found", page=page_name)
             return None
-        result = WikiPageInfo(
-            page_name=page.title,
-            world_freqs=WordFrequencyCalculator.calculate_word_frequency(page.text),
-            links=list(page.links.keys())
-        )
+        with metrics.stage("tokenize"):
+            world_freqs = WordFrequencyCalculator.calculate_word_frequency(
+                text, self._language
+            )
+        result = WikiPageInfo(page_name=title, world_freqs=world_freqs, links=links)
         if self._use_cache:
-            self._cache.set(page_name, result)
+            self._cache.set(cache_key, result)
         return result
@@ -0,0 +1,208 @@
+import heapq
+import math
+import os
+from array import array
+from collections import Counter
+
+
+DEFAULT_SKETCH_EPSILON = 0.0001
+DEFAULT_SKETCH_DELTA = 0.01
+DEFAULT_SKETCH_TOP_K = 1000
+DEFAULT_SKETCH_BUFFER_SIZE = 100_000
+
+
+class CountMinSketch:
+    """
+    Approximate counts of a stream of words in a fixed table of
+    depth rows of width counters.
+
+    An estimate is never below the true count, and with probability
+    1 - delta it is at most epsilon * total above it, where total is
+    the sum of all added counts.
+    """
+
+    def __init__(self, epsilon: float, delta: float) -> None:
+        """
+        Args:
+            epsilon: The relative error of the estimates.
+            delta: The probability of an estimate exceeding the error.
+        """
+        self.epsilon = epsilon
+        self.delta = delta
+        self._width = math.ceil(math.e / epsilon)
+        self._depth = math.ceil(math.log(1 / delta))
+        self._table = [array("q", bytes(8 * self._width)) for _ in range(self._depth)]
+        self.total = 0
+
+    def _indexes(self, word: str) -> list[int]:
+        # Rows are derived from one hash by double hashing, hash() is
+        # stable within the process the sketch lives in.
+        hashed = hash(word) & 0xFFFFFFFFFFFFFFFF
+        first, second = hashed & 0xFFFFFFFF, (hashed >> 32) | 1
+        return [(first + row * second) % self._width for row in range(self._depth)]
+
+    def add(self, word: str, count: int = 1) -> int:
+        """
+        Add a count of a word.
+
+        Returns:
+            The estimate of the word after the addition.
+        """
+        self.total += count
+        hashed = hash(word) & 0xFFFFFFFFFFFFFFFF
+        index, step = hashed & 0xFFFFFFFF, (hashed >> 32) | 1
+        width = self._width
+        estimate = None
+        for row in self._table:
+            index %= width
+            row[index] += count
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+            index += step
+        return estimate
+
+    def estimate(self, word: str) -> int:
+        return min(row[index] for row, index in zip(self._table, self._indexes(word)))
+
+    @property
+    def error_bound(self) -> int:
+        """
+        The maximum overestimate of a count with probability 1 - delta.
+        """
+        return math.ceil(self.epsilon * self.total)
+
+
+class SpaceSaving:
+    """
+    The top words of a stream of words, monitoring at most capacity words.
+
+    A monitored count is never below the true count and at most its
+    error above it. Every word more frequent than total / capacity is
+    monitored.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Args:
+            capacity: The number of monitored words.
+        """
+        self._capacity = capacity
+        self._counts: dict[str, tuple[int, int]] = {}
+        # Entries of words whose count changed since are skipped.
+        self._heap: list[tuple[int, str]] = []
+
+    def add(self, word: str, count: int = 1, estimate: int | None = None) -> None:
+        """
+        Add a count of a word.
+
+        Args:
+            word: The word.
+            count: The count to add.
+            estimate: An upper bound of the total count of the word, e.g.
+                      from a CountMinSketch. A word not monitored replaces
+                      the minimum only if its estimate exceeds it, and is
+                      monitored with the estimate instead of the minimum.
+        """
+        if word in self._counts:
+            current, error = self._counts[word]
+            self._counts[word] = (current + count, error)
+        elif len(self._counts) < self._capacity:
+            self._counts[word] = (count, 0)
+        elif estimate is None:
+            minimum, evicted = self._pop_minimum()
+            del self._counts[evicted]
+            self._counts[word] = (minimum + count, minimum)
+        elif estimate > self._peek_minimum():
+            _, evicted = self._pop_minimum()
+            del self._counts[evicted]
+            self._counts[word] = (estimate, estimate - count)
+        else:
+            # Most words of a stream are rare and end here, without
+            # touching the heap.
+            return
+        heapq.heappush(self._heap, (self._counts[word][0], word))
+        if len(self._heap) > 4 * self._capacity:
+            self._heap = [(current, word) for word, (current, _) in self._counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_minimum(self) -> tuple[int, str]:
+        self._peek_minimum()
+        return heapq.heappop(self._heap)
+
+    def _peek_minimum(self) -> int:
+        while True:
+            count, word = self._heap[0]
+            if word in self._counts and self._counts[word][0] == count:
+                return count
+            heapq.heappop(self._heap)
+
+    def items(self) -> dict[str, tuple[int, int]]:
+        """
+        The monitored words with their counts and errors.
+        """
+        return dict(self._counts)
+
+
+class WordSketch:
+    """
+    Approximate word frequencies in memory bounded by the error and the
+    number of top words, whatever the vocabulary size. Counts are kept
+    in a CountMinSketch and the top words in a SpaceSaving summary, the
+    estimate of a top word is the lower of both. Counts are merged in a
+    buffer of at most buffer_size words before they are added to both,
+    most words of a page are repeated by the next pages.
+    """
+    EPSILON = float(os.environ.get("SKETCH_EPSILON", DEFAULT_SKETCH_EPSILON))
+    DELTA = float(os.environ.get("SKETCH_DELTA", DEFAULT_SKETCH_DELTA))
+    TOP_K = int(os.environ.get("SKETCH_TOP_K", DEFAULT_SKETCH_TOP_K))
+    BUFFER_SIZE = int(os.environ.get("SKETCH_BUFFER_SIZE", DEFAULT_SKETCH_BUFFER_SIZE))
+
+    def __init__(
+        self,
+        epsilon: float | None = None,
+        delta: float | None = None,
+        top_k: int | None = None,
+        buffer_size: int | None = None
+    ) -> None:
+        """
+        Args:
+            epsilon: The relative error of the counts.
+            delta: The probability of a count exceeding the error.
+            top_k: The number of top words kept.
+            buffer_size: The number of words merged before they are
+                         added to the sketch.
+        """
+        self._count_min = CountMinSketch(epsilon or self.EPSILON, delta or self.DELTA)
+        self._top_words = SpaceSaving(top_k or self.TOP_K)
+        self._buffer_size = buffer_size or self.BUFFER_SIZE
+        self._buffer: Counter = Counter()
+
+    @property
+    def total(self) -> int:
+        return self._count_min.total + self._buffer.total()
+
+    def update(self, word_frequencies: Counter) -> None:
+        self._buffer.update(word_frequencies)
+        if len(self._buffer) >= self._buffer_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        count_min, top_words = self._count_min, self._top_words
+        for word, count in self._buffer.items():
+            top_words.add(word, count, count_min.add(word, count))
+        self._buffer = Counter()
+
+    def top_words(self) -> dict[str, tuple[int, int]]:
+        """
+        The estimated counts of the top words.
+
+        Returns:
+            The estimate of every top word with its maximum error,
+            the true count is between estimate - error and estimate.
+        """
+        self._flush()
+        estimates = {}
+        for word, (count, error) in self._top_words.items().items():
+            estimate = min(count, self._count_min.estimate(word))
+            estimates[word] = (estimate, estimate - (count - error))
+        return estimates
@@ -0,0 +1,230 @@
+import argparse
+import mmap
+import os
+from array import array
+from collections import Counter
+from functools import partial
+from multiprocessing import Pool
+from typing import Iterator
+
+import structlog
+
+from src.dump_fetcher import iter_raw_pages, normalize_title, parse_wikitext
+from src.word_frequency_calculator import DEFAULT_LANGUAGE, WordFrequencyCalculator
+
+
+logger = structlog.get_logger(__name__)
+
+VOCABULARY_FILE = "vocabulary.txt"
+TITLES_FILE = "titles.txt"
+REDIRECTS_FILE = "redirects.tsv"
+PAGE_OFFSETS_FILE = "page_offsets.u64"
+WORD_IDS_FILE = "word_ids.u32"
+COUNTS_FILE = "counts.u32"
+LINK_OFFSETS_FILE = "link_offsets.u64"
+LINKS_FILE = "links.u32"
+LANGUAGE_FILE = "language.txt"
+
+DEFAULT_CHUNK_SIZE = 64
+FLUSH_SIZE = 1 << 20
+
+
+def _index_page(language: str, wikitext: str) -> tuple[list[tuple[str, int]], list[str]]:
+    text, links = parse_wikitext(wikitext)
+    frequencies = WordFrequencyCalculator.calculate_word_frequency(text, language)
+    return list(frequencies.items()), list(links)
+
+
+def _iter_wikitexts(dump_path: str) -> Iterator[str]:
+    for raw_page in iter_raw_pages(dump_path):
+        if raw_page.redirect is None:
+            yield raw_page.wikitext
+
+
+def _flush(buffer: array, file, force: bool = False) -> None:
+    if force or len(buffer) >= FLUSH_SIZE:
+        buffer.tofile(file)
+        del buffer[:]
+
+
+def build_term_index(
+    dump_path: str,
+    index_path: str,
+    processes: int | None = None,
+    language: str = DEFAULT_LANGUAGE
+) -> int:
+    """
+    Tokenize a dump once and write a columnar term-count index.
+
+    The index holds a vocabulary table, per-page sparse (word_id, count)
+    arrays and the link adjacency of the pages, all as flat binary arrays
+    that TermIndex memory-maps.
+
+    Args:
+        dump_path: Path of the dump, plain XML or bz2 compressed.
+        index_path: Directory the index is written to.
+        processes: Number of tokenizing processes, defaults to the CPU count.
+        language: The language of the dump, selects the tokenizer.
+
+    Returns:
+        The number of indexed pages.
+    """
+    os.makedirs(index_path, exist_ok=True)
+    with open(os.path.join(index_path, LANGUAGE_FILE), "w", encoding="utf-8") as language_file:
+        language_file.write(f"{language}\n")
+    page_ids: dict[str, int] = {}
+    redirects: dict[str, str] = {}
+    for raw_page in iter_raw_pages(dump_path):
+        if raw_page.redirect is not None:
+            redirects[raw_page.title] = raw_page.redirect
+        else:
+            page_ids.setdefault(raw_page.title, len(page_ids))
+    with open(os.path.join(index_path, TITLES_FILE), "w", encoding="utf-8") as titles:
+        titles.writelines(f"{title}\n" for title in page_ids)
+    with open(os.path.join(index_path, REDIRECTS_FILE), "w", encoding="utf-8") as redirect_file:
+        for title, target in redirects.items():
+            if target in page_ids and title not in page_ids:
+                redirect_file.write(f"{title}\t{page_ids[target]}\n")
+
+    word_ids: dict[str, int] = {}
+    page_offsets, link_offsets = array("Q", [0]), array("Q", [0])
+    word_id_buffer, count_buffer, link_buffer = array("I"), array("I"), array("I")
+    postings = links_total = 0
+    with (
+        open(os.path.join(index_path, WORD_IDS_FILE), "wb") as word_id_file,
+        open(os.path.join(index_path, COUNTS_FILE), "wb") as count_file,
+        open(os.path.join(index_path, LINKS_FILE), "wb") as link_file,
+        Pool(processes) as pool,
+    ):
+        results = pool.imap(partial(_index_page, language), _iter_wikitexts(dump_path), DEFAULT_CHUNK_SIZE)
+        for frequencies, links in results:
+            for word, count in frequencies:
+                word_id_buffer.append(word_ids.setdefault(word, len(word_ids)))
+                count_buffer.append(count)
+            postings += len(frequencies)
+            page_offsets.append(postings)
+            for link in links:
+                target_id = page_ids.get(redirects.get(link, link))
+                if target_id is not None:
+                    link_buffer.append(target_id)
+                    links_total += 1
+            link_offsets.append(links_total)
+            _flush(word_id_buffer, word_id_file)
+            _flush(count_buffer, count_file)
+            _flush(link_buffer, link_file)
+        _flush(word_id_buffer, word_id_file, force=True)
+        _flush(count_buffer, count_file, force=True)
+        _flush(link_buffer, link_file, force=True)
+    with open(os.path.join(index_path, PAGE_OFFSETS_FILE), "wb") as offsets_file:
+        page_offsets.tofile(offsets_file)
+    with open(os.path.join(index_path, LINK_OFFSETS_FILE), "wb") as offsets_file:
+        link_offsets.tofile(offsets_file)
+    with open(os.path.join(index_path, VOCABULARY_FILE), "w", encoding="utf-8") as vocabulary:
+        vocabulary.writelines(f"{word}\n" for word in word_ids)
+    logger.info(
+        "Term index built",
+        dump=dump_path,
+        index=index_path,
+        language=language,
+        pages=len(page_ids),
+        words=len(word_ids),
+        postings=postings,
+        links=links_total
+    )
+    return len(page_ids)
+
+
+class TermIndex:
+    def __init__(self, index_path: str) -> None:
+        """
+        Open a term index built by build_term_index. The count and link
+        arrays are memory-mapped, only the titles and the vocabulary
+        are loaded to memory.
+
+        Args:
+            index_path: Directory of the index.
+        """
+        self._index_path = index_path
+        language_path = os.path.join(index_path, LANGUAGE_FILE)
+        # Indexes built before languages were recorded are English.
+        self.language = DEFAULT_LANGUAGE
+        if os.path.exists(language_path):
+            with open(language_path, encoding="utf-8") as language_file:
+                self.language = language_file.read().strip()
+        with open(os.path.join(index_path, VOCABULARY_FILE), encoding="utf-8") as vocabulary:
+            self._vocabulary = vocabulary.read().splitlines()
+        with open(os.path.join(index_path, TITLES_FILE), encoding="utf-8") as titles:
+            self._titles = titles.read().splitlines()
+        self._page_ids = {title: page_id for page_id, title in enumerate(self._titles)}
+        with open(os.path.join(index_path, REDIRECTS_FILE), encoding="utf-8") as redirects:
+            for line in redirects:
+                title, page_id = line.rstrip("\n").split("\t")
+                self._page_ids[title] = int(page_id)
+        self._mmaps: list[mmap.mmap] = []
+        self._page_offsets = self._map_array(PAGE_OFFSETS_FILE, "Q")
+        self._word_ids = self._map_array(WORD_IDS_FILE, "I")
+        self._counts = self._map_array(COUNTS_FILE, "I")
+        self._link_offsets = self._map_array(LINK_OFFSETS_FILE, "Q")
+        self._links = self._map_array(LINKS_FILE, "I")
+
+    def _map_array(self, file_name: str, type_code: str) -> memoryview:
+        with open(os.path.join(self._index_path, file_name), "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return memoryview(array(type_code))
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mmaps.append(mapped)
+        return memoryview(mapped).cast(type_code)
+
+    def page_id(self, page_name: str) -> int | None:
+        """
+        Look up the id of a page by its title, redirects resolve to
+        their target page.
+        """
+        if not page_name:
+            return None
+        return self._page_ids.get(normalize_title(page_name))
+
+    def title(self, page_id: int) -> str:
+        return self._titles[page_id]
+
+    def links(self, page_id: int) -> memoryview:
+        """
+        Return the ids of the pages linked from a page.
+        """
+        return self._links[self._link_offsets[page_id]:self._link_offsets[page_id + 1]]
+
+    def add_word_counts(self, page_id: int, word_counts: Counter) -> int:
+        """
+        Add the word counts of a page to a Counter keyed by word ids.
+
+        Returns:
+            The total number of words of the page.
+        """
+        start, end = self._page_offsets[page_id], self._page_offsets[page_id + 1]
+        counts = self._counts[start:end]
+        word_counts.update(dict(zip(self._word_ids[start:end], counts)))
+        return sum(counts)
+
+    def words(self, word_counts: Counter) -> Counter:
+        """
+        Translate a Counter keyed by word ids to a Counter keyed by words.
+        """
+        return Counter({self._vocabulary[word_id]: count for word_id, count in word_counts.items()})
+
+    def close(self) -> None:
+        for view in (self._page_offsets, self._word_ids, self._counts, self._link_offsets, self._links):
+            view.release()
+        for mapped in self._mmaps:
+            mapped.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build a term-count index from a Wikipedia XML dump"
+    )
+    parser.add_argument("dump_path")
+    parser.add_argument("index_path")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--lang", default=DEFAULT_LANGUAGE, help="The language of the dump")
+    args = parser.parse_args()
+    build_term_index(args.dump_path, args.index_path, args.processes, args.lang)
@@ -0,0 +1,142 @@
+import hashlib
+import math
+import os
+import tempfile
+from typing import IO, Iterator
+
+
+DEFAULT_VISITED_ERROR_RATE = 0.001
+DEFAULT_VISITED_INITIAL_CAPACITY = 100_000
+DEFAULT_FRONTIER_MEMORY_LIMIT = 100_000
+
+
+class _BloomSlice:
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.capacity = capacity
+        self.count = 0
+        self._bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self._hashes = max(1, round(self._bits / capacity * math.log(2)))
+        self._array = bytearray(math.ceil(self._bits / 8))
+
+    def _indexes(self, first: int, second: int) -> Iterator[int]:
+        for number in range(self._hashes):
+            yield (first + number * second) % self._bits
+
+    def __contains__(self, hashes: tuple[int, int]) -> bool:
+        return all(
+            self._array[index >> 3] & (1 << (index & 7))
+            for index in self._indexes(*hashes)
+        )
+
+    def add(self, hashes: tuple[int, int]) -> None:
+        for index in self._indexes(*hashes):
+            self._array[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+
+class ScalableBloomFilter:
+    """
+    A set of titles kept as bits of their 64-bit hashes, a few bytes per
+    title whatever its length. It grows by adding slices of doubling
+    capacity and halving error rate, so the false positive rate of the
+    whole filter stays below error_rate however many titles are added.
+    False positives make a title look already added, there are no false
+    negatives.
+    """
+    ERROR_RATE = float(os.environ.get("VISITED_ERROR_RATE", DEFAULT_VISITED_ERROR_RATE))
+    INITIAL_CAPACITY = int(os.environ.get(
+        "VISITED_INITIAL_CAPACITY", DEFAULT_VISITED_INITIAL_CAPACITY)
+    )
+
+    def __init__(
+        self,
+        error_rate: float | None = None,
+        initial_capacity: int | None = None
+    ) -> None:
+        """
+        Args:
+            error_rate: The maximum false positive rate.
+            initial_capacity: The number of titles of the first slice.
+        """
+        self.error_rate = error_rate or self.ERROR_RATE
+        self._initial_capacity = initial_capacity or self.INITIAL_CAPACITY
+        self._slices: list[_BloomSlice] = []
+
+    def __len__(self) -> int:
+        return sum(bloom_slice.count for bloom_slice in self._slices)
+
+    @staticmethod
+    def _hashes(title: str) -> tuple[int, int]:
+        digest = hashlib.blake2b(title.encode("utf-8"), digest_size=16).digest()
+        return int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big") | 1
+
+    def __contains__(self, title: str) -> bool:
+        hashes = self._hashes(title)
+        return any(hashes in bloom_slice for bloom_slice in self._slices)
+
+    def add(self, title: str) -> bool:
+        """
+        Add a title.
+
+        Returns:
+            False if the title was already added, or is a false positive.
+        """
+        hashes = self._hashes(title)
+        if any(hashes in bloom_slice for bloom_slice in self._slices):
+            return False
+        if not self._slices or self._slices[-1].count >= self._slices[-1].capacity:
+            number = len(self._slices)
+            # The error rates of the slices sum up to at most error_rate.
+            self._slices.append(_BloomSlice(
+                self._initial_capacity * 2 ** number,
+                self.error_rate * 0.5 ** (number + 1)
+            ))
+        self._slices[-1].add(hashes)
+        return True
+
+
+class DiskFrontier:
+    """
+    An append-only list of titles spilled to a temporary file once it
+    holds more than memory_limit titles, to be iterated after.
+    """
+    MEMORY_LIMIT = int(os.environ.get("FRONTIER_MEMORY_LIMIT", DEFAULT_FRONTIER_MEMORY_LIMIT))
+
+    def __init__(self, titles: list[str] | None = None, memory_limit: int | None = None) -> None:
+        """
+        Args:
+            titles: The initial titles.
+            memory_limit: The number of titles kept in memory.
+        """
+        self._memory_limit = memory_limit or self.MEMORY_LIMIT
+        self._titles: list[str] = []
+        self._spill: IO[str] | None = None
+        self._length = 0
+        for title in titles or []:
+            self.append(title)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def append(self, title: str) -> None:
+        self._titles.append(title)
+        self._length += 1
+        if len(self._titles) > self._memory_limit:
+            if self._spill is None:
+                self._spill = tempfile.NamedTemporaryFile("w", encoding="utf-8", prefix="frontier-")
+            self._spill.writelines(f"{title}\n" for title in self._titles)
+            self._titles = []
+
+    def __iter__(self) -> Iterator[str]:
+        if self._spill is not None:
+            self._spill.flush()
+            with open(self._spill.name, encoding="utf-8") as spill:
+                for line in spill:
+                    yield line.rstrip("\n")
+        yield from self._titles
+
+    def close(self) -> None:
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        self._titles = []
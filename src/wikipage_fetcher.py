@@ -1,21 +1,142 @@
-import wikipediaapi
+import fcntl
+import os
+import struct
+from threading import Lock
+from time import monotonic, sleep, time
+from typing import TYPE_CHECKING, Protocol
+
 import structlog
 
+from src import metrics
+
+if TYPE_CHECKING:
+    import requests
+    import wikipediaapi
+
 
 logger = structlog.get_logger(__name__)
 
 
+class FetchedPage(Protocol):
+    """
+    The part of a fetched page the crawl relies on.
+    """
+    title: str
+    text: str
+    links: dict
+
+
+class PageFetcher(Protocol):
+    """
+    Interface of page fetchers used by the PageHandler.
+    """
+
+    def fetch_page(self, page_name: str) -> FetchedPage | None:
+        ...
+
+
+class RateLimiter:
+    """
+    A thread-safe limiter spacing calls evenly up to a maximum rate.
+    """
+
+    def __init__(self, max_per_second: float) -> None:
+        self._interval = 1 / max_per_second
+        self._next_slot = monotonic()
+        self._lock = Lock()
+
+    def acquire(self) -> None:
+        """
+        Wait until the next call is allowed.
+        """
+        with self._lock:
+            now = monotonic()
+            slot = self._reserve_slot(now)
+        if slot > now:
+            sleep(slot - now)
+
+    def _reserve_slot(self, now: float) -> float:
+        slot = max(self._next_slot, now)
+        self._next_slot = slot + self._interval
+        return slot
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    A RateLimiter shared by the processes of a host, e.g. the workers of
+    the production server, through a locked file holding the next free
+    slot as wall-clock time. The processes together stay under the rate.
+    """
+    SLOT_FORMAT = "d"
+
+    def __init__(self, max_per_second: float, path: str) -> None:
+        """
+        Args:
+            max_per_second: The maximum rate of all the processes together.
+            path: The slot file, created if missing.
+        """
+        super().__init__(max_per_second)
+        self._path = path
+        self._descriptor: int | None = None
+        self._pid: int | None = None
+
+    def _file(self) -> int:
+        # Forked processes open their own descriptor, flock does not
+        # exclude the processes sharing an inherited one.
+        if self._pid != os.getpid():
+            self._descriptor = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._descriptor
+
+    def _reserve_slot(self, now: float) -> float:
+        descriptor = self._file()
+        fcntl.flock(descriptor, fcntl.LOCK_EX)
+        try:
+            wall_now = time()
+            data = os.pread(descriptor, struct.calcsize(self.SLOT_FORMAT), 0)
+            next_slot = struct.unpack(self.SLOT_FORMAT, data)[0] if data else wall_now
+            slot = max(next_slot, wall_now)
+            os.pwrite(descriptor, struct.pack(self.SLOT_FORMAT, slot + self._interval), 0)
+        finally:
+            fcntl.flock(descriptor, fcntl.LOCK_UN)
+        return now + (slot - wall_now)
+
+
+def limit_session_requests(session: "requests.Session", rate_limiter: RateLimiter) -> None:
+    """
+    Make every HTTPS request of a requests session wait for the rate
+    limiter, retries and continuations included.
+    """
+    from requests.adapters import HTTPAdapter
+
+    class RateLimitedAdapter(HTTPAdapter):
+        def send(self, request, *args, **kwargs):
+            rate_limiter.acquire()
+            return super().send(request, *args, **kwargs)
+
+    session.mount("https://", RateLimitedAdapter())
+
+
 class WikiPageFetcher:
-    def __init__(self, wiki_api: wikipediaapi.Wikipedia):
+    def __init__(
+        self,
+        wiki_api: "wikipediaapi.Wikipedia",
+        rate_limiter: RateLimiter | None = None
+    ):
         """
         Initialize the WikiPageFetcher with a Wikipedia API instance.
 
         Args:
             wiki_api: A Wikipedia API instance.
+            rate_limiter: An optional limiter of the upstream HTTP requests.
         """
         self._wiki_api = wiki_api
+        if rate_limiter:
+            # A page takes several requests: its info, text and links,
+            # and their continuations.
+            limit_session_requests(wiki_api._session, rate_limiter)
 
-    def fetch_page(self, page_name: str) -> wikipediaapi.WikipediaPage | None:
+    def fetch_page(self, page_name: str) -> "wikipediaapi.WikipediaPage | None":
         """
         Fetch a Wikipedia page and return a WikiPageInfo object.
 
@@ -27,13 +148,21 @@ class WikiPageFetcher:
             otherwise None.
         """
         try:
+            # The page is lazy, the upstream requests are sent by exists()
+            # and by the first access of its text and links.
             page = self._wiki_api.page(page_name)
+            exists = page.exists()
+            if exists:
+                page.text, page.links
         except Exception:
             logger.warning(
                 "Error fetching page", page=page_name, exc_info=True
             )
+            metrics.count_upstream_request("error")
             return None
-        if not page.exists():
+        if not exists:
             logger.warning("Page does not exist", page=page_name)
+            metrics.count_upstream_request("not_found")
             return None
+        metrics.count_upstream_request("ok")
         return page
@@ -1,20 +1,82 @@
 from collections import Counter
 import re
+import unicodedata
+
+
+DEFAULT_LANGUAGE = "en"
+# Combining marks are encoded in the first two planes and in the
+# variation selectors supplement only.
+COMBINING_MARK_CODE_POINTS = (range(0x20000), range(0xE0100, 0xE01F0))
+
+
+def _combining_marks() -> str:
+    """
+    A character class body of the combining marks (Mn, Mc, Me), which
+    re's \\w does not match although they are part of the words of e.g.
+    Devanagari, Tamil or vocalized Arabic.
+    """
+    ranges: list[tuple[int, int]] = []
+    for code_point in (code_point for block in COMBINING_MARK_CODE_POINTS for code_point in block):
+        if unicodedata.category(chr(code_point))[0] == "M":
+            if ranges and ranges[-1][1] == code_point - 1:
+                ranges[-1] = (ranges[-1][0], code_point)
+            else:
+                ranges.append((code_point, code_point))
+    return "".join(
+        re.escape(chr(first)) if first == last else f"{re.escape(chr(first))}-{re.escape(chr(last))}"
+        for first, last in ranges
+    )
+
+
+COMBINING_MARKS = _combining_marks()
+# Words of any script starting with a letter, with their combining marks.
+UNICODE_WORD = rf"(?<![\w{COMBINING_MARKS}])[^\W\d_][\w{COMBINING_MARKS}]*"
+UNICODE_WORD_PATTERN = re.compile(UNICODE_WORD)
+HAN = r"一-鿿㐀-䶿"
+# Languages written without spaces are split into runs of the same script,
+# a cheap approximation of dictionary based segmentation.
+SCRIPT_RUN_PATTERN = re.compile(
+    rf"[{HAN}]+"
+    r"|[぀-ゟ]+"
+    r"|[゠-ヿㇰ-ㇿｦ-ﾟ]+"
+    r"|[฀-๿]+"
+    rf"|{UNICODE_WORD}"
+)
+SCRIPT_RUN_LANGUAGES = {"ja", "zh", "th", "lo", "km", "my"}
+# Chinese has no kana between its words, its Han runs are whole clauses
+# and are counted as overlapping character bigrams instead.
+HAN_BIGRAM_LANGUAGES = {"zh"}
+HAN_RUN_PATTERN = re.compile(rf"[{HAN}]{{2,}}")
 
 
 class WordFrequencyCalculator:
 
     @classmethod
-    def calculate_word_frequency(self, text: str) -> Counter:
+    def calculate_word_frequency(self, text: str, language: str = DEFAULT_LANGUAGE) -> Counter:
         """
         Calculate the frequency of each word in a given text.
 
         Args:
             text: The text to calculate the word frequency of.
+            language: The language code of the text, selects the tokenizer.
 
         Returns:
             A Counter object containing the frequency of each word in the text.
         """
-        cleaned = re.sub(r"[^a-zA-Z0-9\s]", " ", text.strip())
-        words = re.findall(r'\b[A-Za-z]\w{0,}\b', cleaned)
+        if language == DEFAULT_LANGUAGE:
+            cleaned = re.sub(r"[^a-zA-Z0-9\s]", " ", text.strip())
+            words = re.findall(r'\b[A-Za-z]\w{0,}\b', cleaned)
+        elif language in SCRIPT_RUN_LANGUAGES:
+            words = SCRIPT_RUN_PATTERN.findall(text)
+            if language in HAN_BIGRAM_LANGUAGES:
+                words = [
+                    bigram
+                    for word in words
+                    for bigram in (
+                        [word[index:index + 2] for index in range(len(word) - 1)]
+                        if HAN_RUN_PATTERN.fullmatch(word) else [word]
+                    )
+                ]
+        else:
+            words = UNICODE_WORD_PATTERN.findall(text)
         return Counter([word.lower() for word in words])
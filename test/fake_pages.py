@@ -0,0 +1,25 @@
+from typing import Callable, Iterable
+from unittest.mock import Mock
+
+
+def mock_page(title: str, text: str, links: Iterable[str] = ()) -> Mock:
+    """
+    A fetched page with the attributes the crawl relies on.
+    """
+    page = Mock()
+    page.title, page.text, page.links = title, text, dict.fromkeys(links)
+    return page
+
+
+def fake_fetch_page(pages: dict[str, tuple[str, Iterable[str]]]) -> Callable[[str], Mock | None]:
+    """
+    A fetch_page serving pages by title from their text and links,
+    None for missing pages.
+    """
+    def fetch_page(page_name: str) -> Mock | None:
+        if page_name not in pages:
+            return None
+        text, links = pages[page_name]
+        return mock_page(page_name, text, links)
+
+    return fetch_page
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from src.admission import AdmissionController, AdmissionRejectedError
+
+
+class TestAdmissionController:
+    """Test cases for AdmissionController class."""
+
+    def test_concurrency_is_bounded(self):
+        """Test case: no more requests run at once than allowed."""
+        controller = AdmissionController(max_concurrent=2, max_queued=10, queue_timeout=5)
+        peak = 0
+
+        async def request():
+            nonlocal peak
+            async with controller.admit():
+                peak = max(peak, controller.running)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*(request() for _ in range(8)))
+
+        asyncio.run(run())
+        assert peak == 2
+        assert controller.running == 0
+        assert controller.queued == 0
+
+    def test_full_queue_rejects(self):
+        """Test negative case: requests over the queue limit are rejected."""
+        controller = AdmissionController(max_concurrent=1, max_queued=1, queue_timeout=5)
+
+        async def request():
+            async with controller.admit():
+                await asyncio.sleep(0.05)
+
+        async def run():
+            return await asyncio.gather(*(request() for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert [isinstance(result, AdmissionRejectedError) for result in results] == [False, False, True]
+
+    def test_queue_timeout_rejects(self):
+        """Test negative case: requests waiting too long are rejected."""
+        controller = AdmissionController(max_concurrent=1, max_queued=5, queue_timeout=0.01)
+
+        async def run():
+            await controller.acquire()
+            with pytest.raises(AdmissionRejectedError):
+                await controller.acquire()
+            controller.release()
+            assert controller.queued == 0
+            async with controller.admit():
+                assert controller.running == 1
+
+        asyncio.run(run())
@@ -0,0 +1,221 @@
+import asyncio
+import json
+from threading import Event
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import ClientDisconnect
+
+import src.api as api
+from src.admission import AdmissionController
+from src.cache import WikiPageCache
+from src.components import PageHandlers
+from src.models import RequestBatch
+from src.page_handler import PageHandler
+from src.term_index import TermIndex, build_term_index
+from src.wikipage_fetcher import WikiPageFetcher
+from test.fake_pages import fake_fetch_page
+from test.test_dump_fetcher import write_dump
+
+
+class TestEndpoints:
+    """Test cases for the API endpoints with stub PageHandlers."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.mock_wiki_fetcher = Mock(spec=WikiPageFetcher)
+        self.mock_wiki_fetcher.fetch_page.side_effect = fake_fetch_page({
+            "A": ("alpha beta.", ["B"]),
+            "B": ("beta gamma.", []),
+        })
+        self.page_handler = PageHandler(self.mock_wiki_fetcher, Mock(spec=WikiPageCache), use_cache=False)
+        self.page_handlers, api.page_handlers = api.page_handlers, PageHandlers(
+            lambda language: self.page_handler, languages=api.WIKI_LANGUAGES
+        )
+        self.admission, api.admission = api.admission, AdmissionController(max_concurrent=1, max_queued=0)
+
+    def teardown_method(self):
+        api.page_handlers = self.page_handlers
+        api.admission = self.admission
+
+    def test_ready(self):
+        """Test case: /ready is 503 until the lifespan built the components."""
+        assert TestClient(api.app).get("/ready").status_code == 503
+        with TestClient(api.app) as client:
+            response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ready"}
+
+    def test_lifespan_preloads_listed_languages(self):
+        """Test case: only the preloaded languages are built on startup,
+        the other allowed languages on their first request."""
+        built = []
+
+        def create_page_handler(language):
+            built.append(language)
+            return self.page_handler
+
+        api.page_handlers = PageHandlers(create_page_handler, languages={"en", "de"})
+        with patch.object(api, "WIKI_PRELOAD_LANGUAGES", {"en"}), TestClient(api.app) as client:
+            assert built == ["en"]
+            client.get("/word-frequency", params={"article": "A", "depth": 0, "lang": "de"})
+        assert built == ["en", "de"]
+
+    def test_cache_snapshot_survives_restart(self, tmp_path):
+        """Test case: a page fetched by a worker is restored by the next start."""
+        WikiPageCache._cache.clear()
+        self.page_handler = PageHandler(self.mock_wiki_fetcher, WikiPageCache(ttl=60), use_cache=True)
+        snapshot_path = str(tmp_path / "cache-snapshot.jsonl.gz")
+        with patch.object(api, "USE_CACHE", True), patch.object(api, "CACHE_SNAPSHOT_PATH", snapshot_path):
+            with TestClient(api.app) as client:
+                client.get("/word-frequency", params={"article": "B", "depth": 0})
+            WikiPageCache._cache.clear()
+            with TestClient(api.app) as client:
+                response = client.get("/word-frequency", params={"article": "B", "depth": 0})
+        WikiPageCache._cache.clear()
+        assert response.json()["gamma"]["count"] == 1
+        self.mock_wiki_fetcher.fetch_page.assert_called_once_with("B")
+
+    def test_keywords_batch(self):
+        """Test case: batch results are streamed as one JSON line per article."""
+        response = TestClient(api.app).post("/keywords/batch", json={"requests": [
+            {"article": "A", "depth": 1},
+            {"article": "Missing", "depth": 1},
+        ]})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = {line["article"]: line for line in map(json.loads, response.text.splitlines())}
+        assert {article: (line["status"], line["lang"]) for article, line in lines.items()} == {
+            "A": (200, "en"), "Missing": (404, "en")
+        }
+        assert lines["A"]["result"]["beta"]["count"] == 2
+        assert api.admission.running == 0
+
+    def test_keywords_batch_term_index(self, tmp_path):
+        """Test case: batches are merged from the term index like single requests."""
+        build_term_index(write_dump(tmp_path, compress=True), str(tmp_path / "index"))
+        term_index = TermIndex(str(tmp_path / "index"))
+        page_handler = PageHandler(
+            self.mock_wiki_fetcher, Mock(spec=WikiPageCache), use_cache=False, term_index=term_index
+        )
+        api.page_handlers = PageHandlers(lambda language: page_handler, languages=api.WIKI_LANGUAGES)
+        client = TestClient(api.app)
+        single_result = client.post("/keywords", json={"article": "Python", "depth": 1}).json()
+        response = client.post("/keywords/batch", json={"requests": [
+            {"article": "Python", "depth": 1},
+            {"article": "Missing", "depth": 1},
+        ]})
+        term_index.close()
+        lines = {line["article"]: line for line in map(json.loads, response.text.splitlines())}
+        assert lines["Python"]["result"] == single_result
+        assert lines["Missing"]["status"] == 404
+        self.mock_wiki_fetcher.fetch_page.assert_not_called()
+
+    def test_server_timing(self):
+        """Test case: Server-Timing reports the stages of single requests and is
+        omitted for streamed batches and requests without stages."""
+        client = TestClient(BaseHTTPMiddleware(api.app, dispatch=api.server_timing))
+        stages = client.post("/keywords", json={"article": "A", "depth": 1}).headers["Server-Timing"]
+        assert {stage.split(";")[0] for stage in stages.split(", ")} == {
+            "fetch", "tokenize", "aggregate", "serialize"
+        }
+        batch_response = client.post("/keywords/batch", json={"requests": [{"article": "A", "depth": 1}]})
+        assert batch_response.status_code == 200
+        assert "Server-Timing" not in batch_response.headers
+        assert "Server-Timing" not in client.get("/").headers
+
+    @pytest.mark.parametrize("method, path, body", [
+        ("GET", "/word-frequency?article=A&depth=1&lang=xx", None),
+        ("POST", "/keywords", {"article": "A", "depth": 1, "lang": "xx"}),
+        ("POST", "/keywords/batch", {"requests": [{"article": "A", "depth": 1, "lang": "xx"}]}),
+    ])
+    def test_unsupported_language(self, method, path, body):
+        """Test negative case: a language outside the allow-list is a bad request."""
+        response = TestClient(api.app).request(method, path, json=body)
+        assert response.status_code == 400
+        self.mock_wiki_fetcher.fetch_page.assert_not_called()
+
+    @pytest.mark.parametrize("method, path, body", [
+        ("GET", "/word-frequency?article=A&depth=1", None),
+        ("POST", "/keywords", {"article": "A", "depth": 1}),
+        ("POST", "/keywords/batch", {"requests": [{"article": "A", "depth": 1}]}),
+    ])
+    def test_overloaded(self, method, path, body):
+        """Test negative case: requests over the admission limit are rejected
+        with a Retry-After header."""
+        asyncio.run(api.admission.acquire())
+        response = TestClient(api.app).request(method, path, json=body)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == api.OVERLOADED_HEADERS["Retry-After"]
+        self.mock_wiki_fetcher.fetch_page.assert_not_called()
+
+
+class TestBatchStreaming:
+    """Test cases for the streaming of batch results."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.admission, api.admission = api.admission, AdmissionController(max_concurrent=1)
+
+    def teardown_method(self):
+        api.admission = self.admission
+
+    def test_slot_released_on_disconnect_before_start(self):
+        """Test case: a client gone before the response starts frees its slot."""
+        started = Event()
+
+        def items():
+            started.set()
+            yield "line\n"
+
+        async def send(message):
+            raise OSError("Client disconnected")
+
+        async def run():
+            await api.admission.acquire()
+            response = api.AdmittedStreamingResponse(api.iterate_until_stopped(items(), Event()))
+            with pytest.raises(ClientDisconnect):
+                await response({"type": "http", "asgi": {"spec_version": "2.4"}}, None, send)
+
+        asyncio.run(run())
+        assert api.admission.running == 0
+        assert not started.is_set()
+
+    def test_cancelled_stream_stops_iterator(self):
+        """Test case: cancelling the stream stops and awaits the running step."""
+        stop, finished = Event(), Event()
+
+        def items():
+            yield "first\n"
+            assert stop.wait(5)
+            finished.set()
+            yield "second\n"
+
+        async def run():
+            iterator = api.iterate_until_stopped(items(), stop)
+            assert await iterator.__anext__() == "first\n"
+            step = asyncio.ensure_future(iterator.__anext__())
+            await asyncio.sleep(0.05)
+            step.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await step
+            assert finished.is_set()
+
+        asyncio.run(run())
+
+
+class TestRequestBatch:
+    """Test cases for RequestBatch model."""
+
+    @pytest.mark.parametrize("mode", ["approximate", "compact_visited"])
+    def test_bounded_modes_rejected(self, mode):
+        """Test negative case: batch items cannot take the bounded memory modes."""
+        with pytest.raises(ValidationError):
+            RequestBatch(requests=[{"article": "A", "depth": 1}, {"article": "B", "depth": 1, mode: True}])
+
+    def test_exact_requests(self):
+        """Test case: exact batch items are accepted."""
+        assert len(RequestBatch(requests=[{"article": "A", "depth": 1}]).requests) == 1
@@ -0,0 +1,128 @@
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.batch_runner import BatchRunner
+from src.cache import WikiPageCache
+from src.models import RequestPost
+from src.page_handler import PageHandler
+from src.term_index import TermIndex, build_term_index
+from src.wikipage_fetcher import WikiPageFetcher
+from test.fake_pages import fake_fetch_page
+from test.test_dump_fetcher import write_dump
+
+
+fetch_page = fake_fetch_page({
+    "Root": ("root words.", ["A", "B", "C"]),
+    "A": ("alpha words.", ["D"]),
+    "B": ("beta words.", []),
+    "C": ("gamma words.", []),
+    "D": ("delta words.", []),
+})
+
+
+class TestBatchRunner:
+    """Test cases for BatchRunner class."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        WikiPageCache._cache.clear()
+        self.mock_wiki_fetcher = Mock(spec=WikiPageFetcher)
+        self.mock_wiki_fetcher.fetch_page.side_effect = fetch_page
+        self.page_handler = PageHandler(
+            self.mock_wiki_fetcher, WikiPageCache(ttl=60), use_cache=False
+        )
+        self.page_handler.MAX_THREADS = 1
+
+    def read_results(self, output_path):
+        with open(output_path, encoding="utf-8") as results:
+            return [json.loads(line) for line in results]
+
+    def test_run_writes_results(self, tmp_path):
+        """Test case: results of every request are written as NDJSON."""
+        output_path = str(tmp_path / "results.ndjson")
+        BatchRunner(self.page_handler, output_path).run([
+            RequestPost(article="Root", depth=2),
+            RequestPost(article="Missing", depth=1),
+        ])
+        results = self.read_results(output_path)
+        assert results[0]["status"] == 200
+        assert results[0]["result"] == self.page_handler.calculate_word_frequency("Root", 2)
+        assert results[1] == {
+            "article": "Missing", "depth": 1, "lang": "en", "status": 404,
+            "detail": "Article 'Missing' not found"
+        }
+
+    def test_languages_finished_separately(self, tmp_path):
+        """Test case: the same article in another language is not skipped as finished."""
+        output_path = str(tmp_path / "results.ndjson")
+        BatchRunner(self.page_handler, output_path).run([RequestPost(article="B", depth=0)])
+        BatchRunner(self.page_handler, output_path).run([
+            RequestPost(article="B", depth=0),
+            RequestPost(article="B", depth=0, lang="de"),
+        ])
+        results = self.read_results(output_path)
+        assert [(result["article"], result["lang"]) for result in results] == [("B", "en"), ("B", "de")]
+
+    def test_resume_interrupted_run(self, tmp_path):
+        """Test case: an interrupted crawl resumes from its checkpoint
+        and finished requests are not run again."""
+        output_path = str(tmp_path / "results.ndjson")
+        requests = [RequestPost(article="B", depth=0), RequestPost(article="Root", depth=2)]
+
+        def interrupted_fetch_page(page_name):
+            if page_name == "C":
+                raise KeyboardInterrupt()
+            return fetch_page(page_name)
+        self.mock_wiki_fetcher.fetch_page.side_effect = interrupted_fetch_page
+        with pytest.raises(KeyboardInterrupt):
+            BatchRunner(self.page_handler, output_path, checkpoint_pages=1).run(requests)
+
+        self.mock_wiki_fetcher.fetch_page.reset_mock()
+        self.mock_wiki_fetcher.fetch_page.side_effect = fetch_page
+        BatchRunner(self.page_handler, output_path, checkpoint_pages=1).run(requests)
+        fetched_after = [call.args[0] for call in self.mock_wiki_fetcher.fetch_page.call_args_list]
+        assert sorted(fetched_after) == ["C", "D"]
+
+        results = self.read_results(output_path)
+        assert [result["article"] for result in results] == ["B", "Root"]
+        assert results[1]["result"] == self.page_handler.calculate_word_frequency("Root", 2)
+
+    def test_state_saved_once_per_level(self, tmp_path):
+        """Test case: the crawl state is saved once per level, the pages
+        fetched within a level are checkpointed as appended counts."""
+        output_path = str(tmp_path / "results.ndjson")
+        with patch.object(
+            BatchRunner, "_save_checkpoint", autospec=True, side_effect=BatchRunner._save_checkpoint
+        ) as save_checkpoint, patch.object(
+            BatchRunner, "_append_counts", autospec=True, side_effect=BatchRunner._append_counts
+        ) as append_counts:
+            BatchRunner(self.page_handler, output_path, checkpoint_pages=1).run(
+                [RequestPost(article="Root", depth=2)]
+            )
+        assert save_checkpoint.call_count == 3
+        assert append_counts.call_count == 4
+        assert self.read_results(output_path)[0]["result"] == self.page_handler.calculate_word_frequency("Root", 2)
+        assert not list(tmp_path.glob("results.ndjson.checkpoints/*"))
+
+    def test_run_from_term_index(self, tmp_path):
+        """Test case: with a term index requests are merged from it
+        without fetching pages or checkpoints."""
+        build_term_index(write_dump(tmp_path, compress=True), str(tmp_path / "index"))
+        term_index = TermIndex(str(tmp_path / "index"))
+        page_handler = PageHandler(
+            self.mock_wiki_fetcher, WikiPageCache(ttl=60), use_cache=False, term_index=term_index
+        )
+        output_path = str(tmp_path / "results.ndjson")
+        with patch.object(BatchRunner, "_save_checkpoint") as save_checkpoint:
+            BatchRunner(page_handler, output_path).run([
+                RequestPost(article="Python", depth=1),
+                RequestPost(article="Missing", depth=1),
+            ])
+        results = self.read_results(output_path)
+        assert results[0]["result"] == page_handler.calculate_word_frequency("Python", 1)
+        assert results[1]["status"] == 404
+        self.mock_wiki_fetcher.fetch_page.assert_not_called()
+        save_checkpoint.assert_not_called()
+        term_index.close()
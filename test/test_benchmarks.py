@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from benchmarks.fake_wiki import FakeWikiPageFetcher, RateLimitExceededError, SyntheticCorpus
+from benchmarks.run import run_benchmarks
+
+
+class TestBenchmarks:
+    """Test cases for the benchmark suite."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.corpus = SyntheticCorpus(number_of_pages=50, vocabulary_size=500, mean_words=50, mean_links=5)
+
+    def test_corpus_is_reproducible(self):
+        """Test case: the same seed generates the same corpus."""
+        corpus = SyntheticCorpus(number_of_pages=50, vocabulary_size=500, mean_words=50, mean_links=5)
+        assert corpus.pages == self.corpus.pages
+        assert all(
+            link in corpus.pages for page in corpus.pages.values() for link in page.links
+        )
+
+    def test_fetcher_rejects_over_rate_limit(self):
+        """Test case: requests over the rate limit are rejected."""
+        fetcher = FakeWikiPageFetcher(self.corpus, max_requests_per_second=2, reject_over_limit=True)
+        assert fetcher.fetch_page("Page 1").title == "Page 1"
+        assert fetcher.fetch_page("Missing") is None
+        with pytest.raises(RateLimitExceededError):
+            fetcher.fetch_page("Page 2")
+        assert fetcher.requests == 3
+        assert fetcher.rejected == 1
+
+    def test_run_benchmarks(self):
+        """Test case: the suite emits results of every fast benchmark."""
+        results = run_benchmarks(
+            number_of_pages=30, mean_words=30, mean_links=3, max_depth=1, repeat=1, latency=0,
+            slow_benchmarks=False
+        )
+        assert set(results["benchmarks"]) == {
+            "word_frequency_calculator",
+            "cache",
+            "page_handler_depth_0",
+            "page_handler_depth_1",
+            "page_handler_depth_1_warm_cache",
+            "page_handler_depth_1_approximate",
+            "page_handler_depth_1_compact_visited",
+            "endpoints",
+        }
+        assert results["benchmarks"]["page_handler_depth_1_warm_cache"]["upstream_requests_per_run"] == 0
+        assert results["benchmarks"]["endpoints"]["post_keywords_batch"]["requests_per_second"] > 0
+
+    @pytest.mark.skipif(
+        not os.environ.get("RUN_SLOW_BENCHMARKS"),
+        reason="Starts API servers in subprocesses, set RUN_SLOW_BENCHMARKS to run"
+    )
+    def test_run_slow_benchmarks(self):
+        """Test case: the distributed and startup benchmarks emit their results."""
+        benchmarks = run_benchmarks(
+            number_of_pages=30, mean_words=30, mean_links=3, max_depth=1, repeat=1, latency=0
+        )["benchmarks"]
+        assert {
+            "distributed_depth_1_1_nodes",
+            "distributed_depth_1_2_nodes",
+            "distributed_depth_1_4_nodes",
+            "startup",
+        } <= set(benchmarks)
+        assert benchmarks["startup"]["time_to_ready_with_snapshot_seconds"] > 0
+        assert benchmarks["startup"]["snapshot_entries"] > 0
@@ -1,7 +1,12 @@
+import multiprocessing
+import os
+import tempfile
+from collections import Counter
 from unittest.mock import patch
 from time import time
 
-from src.cache import Cache
+from src.cache import Cache, SqliteWikiPageCache, WikiPageCache
+from src.models import WikiPageInfo
 
 
 class TestCache:
@@ -75,3 +80,100 @@ class TestCache:
         for key, expected_data in entries.items():
             result = self.cache.get(key)
             assert result == expected_data
+
+
+class TestSqliteWikiPageCache:
+    """Test cases for SqliteWikiPageCache class."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite")
+        self.cache = SqliteWikiPageCache(self.path, ttl=60)
+        self.page_info = WikiPageInfo(
+            page_name="Page", world_freqs=Counter({"word": 2}), links=["Other"]
+        )
+
+    def teardown_method(self):
+        self.directory.cleanup()
+
+    def test_set_get_operation(self):
+        """Test case: pages are stored and read back unchanged."""
+        assert self.cache.get("en:Page") is None
+        self.cache.set("en:Page", self.page_info)
+        result = self.cache.get("en:Page")
+        assert result == self.page_info
+        assert isinstance(result.world_freqs, Counter)
+
+    def test_shared_between_processes(self):
+        """Test case: a page set in another process is a hit."""
+        process = multiprocessing.get_context("fork").Process(
+            target=self.cache.set, args=("en:Page", self.page_info)
+        )
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+        assert SqliteWikiPageCache(self.path, ttl=60).get("en:Page") == self.page_info
+        assert self.cache.get("en:Page") == self.page_info
+
+    def test_outdated_entry_removal(self):
+        """Test case: outdated entries are removed on get."""
+        self.cache.set("en:Page", self.page_info)
+        with patch('src.cache.time') as mock_time:
+            mock_time.return_value = time() + 120
+            assert self.cache.get("en:Page") is None
+        assert self.cache.get("en:Page") is None
+
+    def test_snapshot_round_trip(self):
+        """Test case: a snapshot restores the pages into another cache once."""
+        snapshot_path = os.path.join(self.directory.name, "snapshot.jsonl.gz")
+        self.cache.set("en:Page", self.page_info)
+        assert self.cache.save_snapshot(snapshot_path) == 1
+
+        WikiPageCache._cache.clear()
+        memory_cache = WikiPageCache(ttl=60)
+        assert memory_cache.restore_snapshot(snapshot_path) == 1
+        assert memory_cache.get("en:Page") == self.page_info
+        WikiPageCache._cache.clear()
+
+        other_cache = SqliteWikiPageCache(os.path.join(self.directory.name, "other.sqlite"), ttl=60)
+        assert other_cache.restore_snapshot(snapshot_path) == 1
+        assert other_cache.restore_snapshot(snapshot_path) == 0
+        assert other_cache.get("en:Page") == self.page_info
+
+    def test_snapshot_merge(self):
+        """Test case: merging keeps the pages saved by another process."""
+        snapshot_path = os.path.join(self.directory.name, "snapshot.jsonl.gz")
+        memory_cache = WikiPageCache(ttl=60)
+        WikiPageCache._cache.clear()
+        memory_cache.set("en:Page", self.page_info)
+        assert memory_cache.save_snapshot(snapshot_path, merge=True) == 1
+        WikiPageCache._cache.clear()
+        memory_cache.set("en:Other", self.page_info)
+        assert memory_cache.save_snapshot(snapshot_path, merge=True) == 2
+        WikiPageCache._cache.clear()
+        assert memory_cache.restore_snapshot(snapshot_path) == 2
+        WikiPageCache._cache.clear()
+
+    def test_snapshot_skips_outdated_entries(self):
+        """Test case: entries outdated since the snapshot are not restored."""
+        snapshot_path = os.path.join(self.directory.name, "snapshot.jsonl")
+        self.cache.set("en:Page", self.page_info)
+        assert self.cache.save_snapshot(snapshot_path) == 1
+        other_cache = SqliteWikiPageCache(os.path.join(self.directory.name, "other.sqlite"), ttl=60)
+        with patch('src.cache.time') as mock_time:
+            mock_time.return_value = time() + 120
+            assert other_cache.restore_snapshot(snapshot_path) == 0
+        assert other_cache.get("en:Page") is None
+
+    def test_snapshot_removes_stale_temporary_files(self):
+        """Test case: temporary files of killed processes are removed on save."""
+        snapshot_path = os.path.join(self.directory.name, "snapshot.jsonl")
+        stale_path = f"{snapshot_path}.4194305.tmp"
+        live_path = f"{snapshot_path}.{os.getppid()}.tmp"
+        for path in (stale_path, live_path):
+            with open(path, "w", encoding="utf-8"):
+                pass
+        assert self.cache.save_snapshot(snapshot_path) == 0
+        assert not os.path.exists(stale_path)
+        assert os.path.exists(live_path)
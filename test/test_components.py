@@ -0,0 +1,43 @@
+from unittest.mock import Mock
+
+import pytest
+
+from src.components import PageHandlers, UnsupportedLanguageError, _language_path
+from src.page_handler import PageHandler
+
+
+class TestPageHandlers:
+    """Test cases for PageHandlers class."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.factory = Mock(side_effect=lambda language: Mock(spec=PageHandler))
+        self.page_handlers = PageHandlers(self.factory)
+
+    def test_created_lazily_once_per_language(self):
+        """Test case: handlers are created on first use and reused."""
+        self.factory.assert_not_called()
+        german = self.page_handlers.get("de")
+        assert self.page_handlers.get("de") is german
+        assert self.page_handlers.get("fr") is not german
+        assert [call.args[0] for call in self.factory.call_args_list] == ["de", "fr"]
+
+    def test_invalid_language(self):
+        """Test negative case: invalid language codes are rejected."""
+        with pytest.raises(UnsupportedLanguageError):
+            self.page_handlers.get("../etc")
+        self.factory.assert_not_called()
+
+    def test_allowed_languages(self):
+        """Test negative case: languages out of the allowed ones are rejected."""
+        page_handlers = PageHandlers(self.factory, languages={"en", "ja"})
+        page_handlers.get("ja")
+        with pytest.raises(UnsupportedLanguageError):
+            page_handlers.get("de")
+
+    def test_language_path(self):
+        """Test case: paths are resolved per language."""
+        assert _language_path("/data/{lang}wiki", "de") == "/data/dewiki"
+        assert _language_path("/data/enwiki", "en") == "/data/enwiki"
+        assert _language_path("/data/enwiki", "de") is None
+        assert _language_path(None, "en") is None
@@ -0,0 +1,107 @@
+from threading import Event, Thread
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.cache import WikiPageCache
+from src.distributed import (
+    CrawlCoordinator,
+    CrawlWorker,
+    InMemoryQueueBackend,
+    ShardTimeoutError,
+    shard_of,
+    task_queue,
+)
+from src.page_handler import PageHandler
+from test.fake_pages import fake_fetch_page
+
+
+fetch_page = fake_fetch_page({
+    "Root": ("Root page about cats and dogs.", ["Cats", "Dogs", "Missing"]),
+    "Cats": ("Cats are small cats.", ["Dogs", "Mice"]),
+    "Dogs": ("Dogs chase cats.", ["Root", "Mice"]),
+    "Mice": ("Mice run from cats.", []),
+})
+
+
+def create_page_handler(**kwargs):
+    fetcher = Mock()
+    fetcher.fetch_page.side_effect = fetch_page
+    cache = Mock(spec=WikiPageCache)
+    cache.get.return_value = None
+    return PageHandler(fetcher, cache, use_cache=False, **kwargs), fetcher
+
+
+class TestDistributedCrawl:
+    """Test cases for CrawlCoordinator and CrawlWorker classes."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.queue_backend = InMemoryQueueBackend()
+        self.stop = Event()
+        self.workers = []
+
+    def teardown_method(self):
+        self.stop.set()
+        for thread in self.workers:
+            thread.join()
+
+    def start_workers(self, number_of_shards):
+        fetchers = []
+        for shard in range(number_of_shards):
+            page_handler, fetcher = create_page_handler()
+            fetchers.append(fetcher)
+            worker = CrawlWorker(page_handler, self.queue_backend, [shard])
+            thread = Thread(target=worker.run, args=(self.stop,))
+            thread.start()
+            self.workers.append(thread)
+        return fetchers
+
+    def test_shard_of_is_stable(self):
+        """Test case: pages map to the same shard in range."""
+        shards = {shard_of(f"Page {number}", 4) for number in range(100)}
+        assert shards == {0, 1, 2, 3}
+        assert shard_of("Cats", 4) == shard_of("Cats", 4)
+
+    def test_distributed_result_matches_local(self):
+        """Test case: a crawl sharded over workers gives the local result."""
+        fetchers = self.start_workers(3)
+        coordinator = CrawlCoordinator(self.queue_backend, 3, task_size=1, shard_timeout=5)
+        page_handler, root_fetcher = create_page_handler(crawl_coordinator=coordinator)
+        local_page_handler, _ = create_page_handler()
+
+        result = page_handler.calculate_word_frequency("Root", depth=2)
+
+        assert result == local_page_handler.calculate_word_frequency("Root", depth=2)
+        assert result["cats"]["count"] == 5
+        root_fetcher.fetch_page.assert_called_once_with("Root")
+        fetched = [call.args[0] for fetcher in fetchers for call in fetcher.fetch_page.call_args_list]
+        assert sorted(fetched) == ["Cats", "Dogs", "Mice", "Missing"]
+
+    def test_missing_worker_times_out(self):
+        """Test negative case: a shard without a worker raises ShardTimeoutError."""
+        coordinator = CrawlCoordinator(self.queue_backend, 2, shard_timeout=0.05)
+        page_handler, _ = create_page_handler(crawl_coordinator=coordinator)
+
+        with patch.object(self.queue_backend, "delete", wraps=self.queue_backend.delete) as delete, \
+                pytest.raises(ShardTimeoutError):
+            page_handler.calculate_word_frequency("Root", depth=1)
+        [queue] = [call.args[0] for call in delete.call_args_list]
+        assert queue.startswith("crawl:results:")
+
+    def test_lost_task_is_requeued(self):
+        """Test case: a task lost by a crashed worker is queued again."""
+        def lose_first_task():
+            assert self.queue_backend.pop([task_queue("en", 0)], timeout=5)
+            self.start_workers(1)
+
+        thread = Thread(target=lose_first_task)
+        thread.start()
+        coordinator = CrawlCoordinator(self.queue_backend, 1, shard_timeout=5, visibility_timeout=0.1)
+        page_handler, _ = create_page_handler(crawl_coordinator=coordinator)
+        local_page_handler, _ = create_page_handler()
+
+        result = page_handler.calculate_word_frequency("Root", depth=1)
+        thread.join()
+
+        assert result == local_page_handler.calculate_word_frequency("Root", depth=1)
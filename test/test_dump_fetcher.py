@@ -0,0 +1,143 @@
+import bz2
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import src.dump_fetcher as dump_fetcher
+from src.dump_fetcher import (
+    DumpPageFetcher,
+    build_dump_store,
+    iter_dump_pages,
+    normalize_title,
+    parse_wikitext,
+)
+from src.page_handler import PageHandler
+from src.cache import WikiPageCache
+
+
+DUMP_XML = """<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/">
+  <siteinfo><sitename>Wikipedia</sitename></siteinfo>
+  <page>
+    <title>Python</title>
+    <ns>0</ns>
+    <revision><text>'''Python''' is a [[programming language]].{{Infobox|x=1}}&lt;ref&gt;A source&lt;/ref&gt; See [[Guido van Rossum|Guido]].[[Category:Languages]]</text></revision>
+  </page>
+  <page>
+    <title>Programming language</title>
+    <ns>0</ns>
+    <revision><text>A programming language is a notation for [[Python]].</text></revision>
+  </page>
+  <page>
+    <title>Guido van Rossum</title>
+    <ns>0</ns>
+    <revision><text>Guido created Python.</text></revision>
+  </page>
+  <page>
+    <title>Python language</title>
+    <ns>0</ns>
+    <redirect title="Python" />
+    <revision><text>#REDIRECT [[Python]]</text></revision>
+  </page>
+  <page>
+    <title>Talk:Python</title>
+    <ns>1</ns>
+    <revision><text>Discussion.</text></revision>
+  </page>
+</mediawiki>
+"""
+
+
+def write_dump(tmp_path, compress: bool) -> str:
+    if compress:
+        dump_path = tmp_path / "dump.xml.bz2"
+        dump_path.write_bytes(bz2.compress(DUMP_XML.encode()))
+    else:
+        dump_path = tmp_path / "dump.xml"
+        dump_path.write_text(DUMP_XML, encoding="utf-8")
+    return str(dump_path)
+
+
+class TestParseWikitext:
+    """Test cases for wikitext parsing."""
+
+    def test_links_and_labels(self):
+        """Test case: internal links are collected and replaced with labels."""
+        text, links = parse_wikitext("See [[Guido van Rossum|Guido]] and [[python_(language)#History]].")
+        assert text == "See Guido and python_(language)#History."
+        assert links == {"Guido van Rossum": None, "Python (language)": None}
+
+    def test_drop_markup(self):
+        """Test case: templates, references and categories are removed."""
+        text, links = parse_wikitext("{{a|{{b}}}}Text<ref name=x>ref</ref><!-- c -->[[Category:X]]")
+        assert text == "Text"
+        assert links == {}
+
+    def test_normalize_title(self):
+        """Test case: titles are normalized like MediaWiki does."""
+        assert normalize_title("python_language") == "Python language"
+
+
+class TestDumpPageFetcher:
+    """Test cases for DumpPageFetcher class."""
+
+    def test_iter_dump_pages_bz2(self, tmp_path):
+        """Test case: compressed dump is streamed, other namespaces skipped."""
+        pages = list(iter_dump_pages(write_dump(tmp_path, compress=True)))
+        assert [page.title for page in pages] == [
+            "Python", "Programming language", "Guido van Rossum", "Python language"
+        ]
+        assert pages[3].redirect == "Python"
+
+    def test_fetch_page(self, tmp_path):
+        """Test case: pages are read from the store by title."""
+        dump_path = write_dump(tmp_path, compress=False)
+        assert build_dump_store(dump_path, str(tmp_path / "store.jsonl")) == 3
+        fetcher = DumpPageFetcher(str(tmp_path / "store.jsonl"))
+        page = fetcher.fetch_page("Python")
+        assert page.title == "Python"
+        assert "programming language" in page.text
+        assert list(page.links) == ["Programming language", "Guido van Rossum"]
+        fetcher.close()
+
+    def test_fetch_redirect_and_missing(self, tmp_path):
+        """Test case: redirects resolve to their target, missing pages are None."""
+        fetcher = DumpPageFetcher.from_dump(write_dump(tmp_path, compress=True))
+        assert fetcher.fetch_page("Python_language").title == "Python"
+        assert fetcher.fetch_page("Talk:Python") is None
+        assert fetcher.fetch_page("") is None
+        fetcher.close()
+
+    def test_from_dump_builds_once(self, tmp_path):
+        """Test case: fetchers created together build the store only once."""
+        dump_path = write_dump(tmp_path, compress=True)
+        with patch.object(dump_fetcher, "build_dump_store", wraps=build_dump_store) as build:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                fetchers = list(executor.map(lambda _: DumpPageFetcher.from_dump(dump_path), range(4)))
+        assert build.call_count == 1
+        assert all(fetcher.fetch_page("Python").title == "Python" for fetcher in fetchers)
+        for fetcher in fetchers:
+            fetcher.close()
+
+    def test_rebuild_keeps_open_store(self, tmp_path):
+        """Test case: rebuilding the store does not change the pages read by
+        an open fetcher, and leaves no temporary files."""
+        dump_path = write_dump(tmp_path, compress=False)
+        store_path = str(tmp_path / "store.jsonl")
+        build_dump_store(dump_path, store_path)
+        fetcher = DumpPageFetcher(store_path)
+        new_dump_path = tmp_path / "new-dump.xml"
+        new_dump_path.write_text(DUMP_XML.replace("is a notation", "is a formal notation"), encoding="utf-8")
+        build_dump_store(str(new_dump_path), store_path)
+        assert fetcher.fetch_page("Guido van Rossum").text == "Guido created Python."
+        assert not list(tmp_path.glob("*.tmp"))
+        fetcher.close()
+
+    def test_page_handler_with_dump(self, tmp_path):
+        """Test case: the page handler crawls a local dump."""
+        WikiPageCache._cache.clear()
+        fetcher = DumpPageFetcher.from_dump(write_dump(tmp_path, compress=True))
+        page_handler = PageHandler(fetcher, WikiPageCache(ttl=60), use_cache=False)
+        result = page_handler.calculate_word_frequency("Python", depth=1)
+        assert result["python"]["count"] == 3
+        assert result["guido"]["count"] == 2
+        assert "infobox" not in result
+        fetcher.close()
@@ -0,0 +1,74 @@
+from contextlib import nullcontext
+from contextvars import copy_context
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+
+from src import metrics
+from src.cache import Cache
+
+
+def run_in_new_context(function):
+    return copy_context().run(function)
+
+
+class TestMetrics:
+    """Test cases for the metrics module."""
+
+    def test_stage_observes_histogram(self):
+        """Test case: stages are observed in the duration histogram."""
+        labels = {"stage": "tokenize"}
+        before = REGISTRY.get_sample_value("word_frequency_stage_duration_seconds_count", labels) or 0
+        with metrics.stage("tokenize"):
+            pass
+        assert REGISTRY.get_sample_value("word_frequency_stage_duration_seconds_count", labels) == before + 1
+
+    def test_request_timings(self):
+        """Test case: stages of a request are summed in its timings."""
+        def request():
+            timings = metrics.start_request_timings()
+            with metrics.stage("fetch"):
+                pass
+            with metrics.stage("fetch"):
+                pass
+            with metrics.stage("serialize"):
+                pass
+            return timings
+        timings = run_in_new_context(request)
+        assert list(timings.durations) == ["fetch", "serialize"]
+        assert timings.server_timing().startswith("fetch;dur=")
+
+    def test_disabled_without_timings_is_noop(self):
+        """Test case: disabled metrics do not time stages."""
+        with patch.object(metrics, "METRICS_ENABLED", False):
+            assert isinstance(metrics.stage("fetch"), nullcontext)
+            assert isinstance(metrics.fetch_in_flight(), nullcontext)
+
+    def test_disabled_with_timings(self):
+        """Test case: request timings work with disabled metrics."""
+        def request():
+            timings = metrics.start_request_timings()
+            with metrics.stage("aggregate"):
+                pass
+            return timings
+        with patch.object(metrics, "METRICS_ENABLED", False):
+            timings = run_in_new_context(request)
+        assert "aggregate" in timings.durations
+
+    def test_cache_requests_counted(self):
+        """Test case: cache hits, misses and evictions are counted."""
+        def sample(name, labels=None):
+            return REGISTRY.get_sample_value(name, labels or {}) or 0
+        hits = sample("word_frequency_cache_requests_total", {"result": "hit"})
+        misses = sample("word_frequency_cache_requests_total", {"result": "miss"})
+        evictions = sample("word_frequency_cache_evictions_total")
+        Cache._cache.clear()
+        cache = Cache[int](ttl=60)
+        cache.set("key", 1)
+        cache.get("key")
+        cache.get("missing")
+        with patch("src.cache.time", return_value=10 ** 10):
+            cache.get("key")
+        assert sample("word_frequency_cache_requests_total", {"result": "hit"}) == hits + 1
+        assert sample("word_frequency_cache_requests_total", {"result": "miss"}) == misses + 2
+        assert sample("word_frequency_cache_evictions_total") == evictions + 1
@@ -1,10 +1,13 @@
 import pytest
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
 from unittest.mock import Mock
 
 from src.page_handler import PageHandler, RootPageNotFoundError
 from src.wikipage_fetcher import WikiPageFetcher
 from src.cache import WikiPageCache
-from src.models import WikiPageInfo
+from src.models import RequestPost, WikiPageInfo
+from test.fake_pages import fake_fetch_page, mock_page
 
 
 class TestPageHandler:
@@ -301,3 +304,155 @@ class TestPageHandler:
         assert result["test"]["count"] == 4
         assert result["test2"]["count"] == 2
         assert result["test3"]["count"] == 2
+
+    def test_calculate_word_frequency_batch_shares_pages(self):
+        """Test case: batch fetches pages shared by the crawls only once."""
+        self.mock_wiki_fetcher.fetch_page.side_effect = fake_fetch_page({
+            "Python": ("Python is a language.", ["Language", "Code"]),
+            "Java": ("Java is a language.", ["Language"]),
+            "Language": ("Language is communication.", ["Code"]),
+            "Code": ("Code is text.", []),
+        })
+        requests = [
+            RequestPost(article="Python", depth=1),
+            RequestPost(article="Java", depth=2, ignore_list=["is"]),
+            RequestPost(article="Missing", depth=1),
+        ]
+        results = list(self.page_handler.calculate_word_frequency_batch(requests))
+        assert [request.article for request, _ in results] == ["Missing", "Python", "Java"]
+        assert isinstance(results[0][1], RootPageNotFoundError)
+        python_result = results[1][1]
+        assert python_result["language"]["count"] == 2
+        assert python_result["code"]["count"] == 1
+        java_result = results[2][1]
+        assert java_result["language"]["count"] == 2
+        assert java_result["code"]["count"] == 1
+        assert "is" not in java_result
+        assert self.mock_wiki_fetcher.fetch_page.call_count == 5
+
+    def test_calculate_word_frequency_batch_matches_single(self):
+        """Test case: batch results equal single request results."""
+        self.mock_wiki_fetcher.fetch_page.side_effect = fake_fetch_page({
+            "A": ("alpha beta.", ["B", "C"]),
+            "B": ("beta gamma.", ["C", "A"]),
+            "C": ("gamma delta.", ["D"]),
+            "D": ("delta.", []),
+        })
+        requests = [RequestPost(article=article, depth=2) for article in ("A", "B")]
+        batch_results = dict(
+            (request.article, result)
+            for request, result in self.page_handler.calculate_word_frequency_batch(requests)
+        )
+        for request in requests:
+            assert batch_results[request.article] == self.page_handler.calculate_word_frequency(
+                request.article, request.depth
+            )
+
+    def test_calculate_word_frequency_batch_self_linking_root(self):
+        """Test case: a root page linking to itself is counted once in batches."""
+        self.mock_wiki_fetcher.fetch_page.side_effect = fake_fetch_page({
+            "A": ("alpha beta.", ["A", "B"]),
+            "B": ("beta.", []),
+        })
+        single_result = self.page_handler.calculate_word_frequency("A", depth=1)
+        [(_, batch_result)] = self.page_handler.calculate_word_frequency_batch(
+            [RequestPost(article="A", depth=1)]
+        )
+        assert batch_result == single_result
+        assert batch_result["alpha"]["count"] == 1
+        assert batch_result["beta"]["count"] == 2
+
+    def test_calculate_word_frequency_batch_stop(self):
+        """Test case: a stopped batch fetches no further level."""
+        self.mock_wiki_fetcher.fetch_page.return_value = mock_page("A", "alpha.", ["B"])
+        stop = Event()
+        stop.set()
+        results = list(self.page_handler.calculate_word_frequency_batch(
+            [RequestPost(article="A", depth=1)], stop
+        ))
+        assert results == []
+        self.mock_wiki_fetcher.fetch_page.assert_called_once_with("A")
+
+    def test_fetch_pages_bounds_queued_pages(self):
+        """Test case: a request queues at most MAX_THREADS pages on a shared executor."""
+        outstanding, peak, lock = 0, 0, Lock()
+
+        class CountingExecutor(ThreadPoolExecutor):
+            def submit(self, *args, **kwargs):
+                nonlocal outstanding, peak
+                with lock:
+                    outstanding += 1
+                    peak = max(peak, outstanding)
+                future = super().submit(*args, **kwargs)
+                future.add_done_callback(lambda _: release())
+                return future
+
+        def release():
+            nonlocal outstanding
+            with lock:
+                outstanding -= 1
+
+        self.mock_wiki_fetcher.fetch_page.return_value = None
+        with CountingExecutor(max_workers=2) as executor:
+            page_handler = PageHandler(
+                self.mock_wiki_fetcher, self._mock_wiki_page_cache, use_cache=False,
+                fetch_executor=executor
+            )
+            page_names = [f"Page {number}" for number in range(5 * PageHandler.MAX_THREADS)]
+            assert page_handler.fetch_pages(page_names) == dict.fromkeys(page_names)
+        assert 0 < peak <= PageHandler.MAX_THREADS
+
+    def test_cache_keys_scoped_by_language(self):
+        """Test case: cache keys of different languages do not collide."""
+        page_handler = PageHandler(
+            self.mock_wiki_fetcher,
+            self._mock_wiki_page_cache,
+            use_cache=True,
+            language="de"
+        )
+        mock_page = Mock()
+        mock_page.title = "Python"
+        mock_page.text = "Python ist eine Programmiersprache für Anfänger."
+        mock_page.links = {}
+        self.mock_wiki_fetcher.fetch_page.return_value = mock_page
+        result = page_handler.calculate_word_frequency("Python", depth=0)
+        assert result["für"]["count"] == 1
+        assert result["anfänger"]["count"] == 1
+        self._mock_wiki_page_cache.get.assert_called_once_with("de:Python")
+        assert self._mock_wiki_page_cache.set.call_args.args[0] == "de:Python"
+
+    def test_calculate_word_frequency_approximate(self):
+        """Test case: approximate results have the exact shape flagged as estimated."""
+        self.mock_wiki_fetcher.fetch_page.side_effect = fake_fetch_page({
+            "A": ("alpha beta alpha.", ["B"]),
+            "B": ("beta gamma alpha.", []),
+        })
+        exact = self.page_handler.calculate_word_frequency("A", depth=1, percentile=20)
+        approximate = self.page_handler.calculate_word_frequency(
+            "A", depth=1, percentile=20, approximate=True
+        )
+        assert set(approximate) == set(exact) == {"alpha", "beta"}
+        for word, stats in approximate.items():
+            assert stats["estimated"] is True
+            assert stats["count"] - stats["max_error"] <= exact[word]["count"] <= stats["count"]
+            assert stats["percent"] == stats["count"] / 6 * 100
+
+    def test_calculate_word_frequency_compact_visited(self):
+        """Test case: compact crawls give the exact result and don't keep titles."""
+        self.mock_wiki_fetcher.fetch_page.side_effect = fake_fetch_page({
+            "A": ("alpha beta.", ["B", "C", "A"]),
+            "B": ("beta gamma.", ["C", "A", "D"]),
+            "C": ("gamma delta.", ["D", "B"]),
+            "D": ("delta epsilon.", ["A", "E"]),
+            "E": ("epsilon.", []),
+        })
+        for depth in range(4):
+            exact = self.page_handler.calculate_word_frequency("A", depth)
+            self.mock_wiki_fetcher.fetch_page.reset_mock()
+            state = self.page_handler.continue_crawl(
+                self.page_handler.start_crawl("A", depth, compact_visited=True)
+            )
+            assert self.page_handler.build_result(state) == exact
+            fetched = [call.args[0] for call in self.mock_wiki_fetcher.fetch_page.call_args_list]
+            assert len(fetched) == len(set(fetched)) == state.number_of_fetched_pages
+            assert state.fetched_pages == set()
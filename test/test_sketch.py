@@ -0,0 +1,74 @@
+import random
+from collections import Counter
+
+from src.sketch import CountMinSketch, SpaceSaving, WordSketch
+
+
+class TestSketch:
+    """Test cases for CountMinSketch, SpaceSaving and WordSketch classes."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        generator = random.Random(42)
+        words = [f"word{number}" for number in range(5000)]
+        weights = [1 / (rank + 1) for rank in range(len(words))]
+        self.counts = Counter(generator.choices(words, weights, k=50000))
+
+    def test_count_min_sketch_error_bound(self):
+        """Test case: estimates are never below and rarely far above the count."""
+        sketch = CountMinSketch(epsilon=0.001, delta=0.01)
+        for word, count in self.counts.items():
+            sketch.add(word, count)
+        assert sketch.total == self.counts.total()
+        errors = [sketch.estimate(word) - count for word, count in self.counts.items()]
+        assert min(errors) >= 0
+        assert sum(error > sketch.error_bound for error in errors) <= 0.01 * len(errors)
+
+    def test_space_saving_keeps_heavy_hitters(self):
+        """Test case: words more frequent than total / capacity are kept with bounded counts."""
+        top_words = SpaceSaving(capacity=100)
+        for word, count in self.counts.items():
+            top_words.add(word, count)
+        items = top_words.items()
+        assert len(items) == 100
+        for word, count in self.counts.items():
+            if count > self.counts.total() / 100:
+                assert word in items
+        for word, (count, error) in items.items():
+            assert count - error <= self.counts[word] <= count
+
+    def test_word_sketch_top_words(self):
+        """Test case: the top words are estimated within their maximum error."""
+        sketch = WordSketch(epsilon=0.001, delta=0.01, top_k=50)
+        sketch.update(self.counts)
+        estimates = sketch.top_words()
+        assert len(estimates) == 50
+        assert sketch.total == self.counts.total()
+        for word in [word for word, count in self.counts.items() if count > self.counts.total() / 50]:
+            estimate, max_error = estimates[word]
+            assert estimate - max_error <= self.counts[word] <= estimate
+
+    def test_space_saving_with_estimates(self):
+        """Test case: words gated by their estimates keep heavy hitters with bounded counts."""
+        sketch = CountMinSketch(epsilon=0.001, delta=0.01)
+        top_words = SpaceSaving(capacity=100)
+        for word, count in self.counts.items():
+            top_words.add(word, count, sketch.add(word, count))
+        items = top_words.items()
+        for word, count in self.counts.items():
+            if count > self.counts.total() / 100 + sketch.error_bound:
+                assert word in items
+        for word, (count, error) in items.items():
+            assert count - error <= self.counts[word] <= count
+
+    def test_word_sketch_buffered_updates(self):
+        """Test case: updates merged in a small buffer keep the estimates bounded."""
+        sketch = WordSketch(epsilon=0.001, delta=0.01, top_k=50, buffer_size=100)
+        words = list(self.counts.elements())
+        for start in range(0, len(words), 1000):
+            sketch.update(Counter(words[start:start + 1000]))
+        assert sketch.total == self.counts.total()
+        estimates = sketch.top_words()
+        for word in [word for word, count in self.counts.items() if count > self.counts.total() / 50]:
+            estimate, max_error = estimates[word]
+            assert estimate - max_error <= self.counts[word] <= estimate
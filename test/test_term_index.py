@@ -0,0 +1,87 @@
+from collections import Counter
+from unittest.mock import Mock
+
+import pytest
+
+from src.cache import WikiPageCache
+from src.dump_fetcher import DumpPageFetcher
+from src.page_handler import PageHandler, RootPageNotFoundError
+from src.term_index import TermIndex, _index_page, build_term_index
+from src.wikipage_fetcher import WikiPageFetcher
+from test.test_dump_fetcher import write_dump
+
+
+class TestTermIndex:
+    """Test cases for TermIndex class."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        WikiPageCache._cache.clear()
+
+    @pytest.fixture
+    def term_index(self, tmp_path):
+        dump_path = write_dump(tmp_path, compress=True)
+        assert build_term_index(dump_path, str(tmp_path / "index"), processes=2) == 3
+        term_index = TermIndex(str(tmp_path / "index"))
+        yield term_index
+        term_index.close()
+
+    def test_page_lookup_and_links(self, term_index):
+        """Test case: pages are looked up by title or redirect."""
+        python_id = term_index.page_id("Python")
+        assert term_index.page_id("Python language") == python_id
+        assert term_index.page_id("Missing") is None
+        assert [term_index.title(page_id) for page_id in term_index.links(python_id)] == [
+            "Programming language", "Guido van Rossum"
+        ]
+
+    def test_word_counts(self, term_index):
+        """Test case: word counts of a page are merged by word id."""
+        word_counts: Counter = Counter()
+        total = term_index.add_word_counts(term_index.page_id("Guido van Rossum"), word_counts)
+        assert total == 3
+        assert term_index.words(word_counts) == Counter({"guido": 1, "created": 1, "python": 1})
+
+    def test_page_handler_matches_live_crawl(self, tmp_path, term_index):
+        """Test case: index results match crawling the same dump."""
+        mock_wiki_fetcher = Mock(spec=WikiPageFetcher)
+        indexed_handler = PageHandler(
+            mock_wiki_fetcher, WikiPageCache(ttl=60), use_cache=False, term_index=term_index
+        )
+        fetcher = DumpPageFetcher.from_dump(str(tmp_path / "dump.xml.bz2"))
+        crawling_handler = PageHandler(fetcher, WikiPageCache(ttl=60), use_cache=False)
+        for depth in range(3):
+            assert indexed_handler.calculate_word_frequency("Python", depth) == \
+                crawling_handler.calculate_word_frequency("Python", depth)
+        mock_wiki_fetcher.fetch_page.assert_not_called()
+        fetcher.close()
+
+    def test_page_handler_root_page_not_found(self, term_index):
+        """Test negative case: missing root page raises RootPageNotFoundError."""
+        page_handler = PageHandler(
+            Mock(spec=WikiPageFetcher), WikiPageCache(ttl=60), use_cache=False, term_index=term_index
+        )
+        with pytest.raises(RootPageNotFoundError):
+            page_handler.calculate_word_frequency("Missing", depth=1)
+
+    def test_language_tokenizer(self):
+        """Test case: pages are tokenized with the tokenizer of the language."""
+        assert _index_page("de", "Die Straße [[Köln]]") == (
+            [("die", 1), ("straße", 1), ("köln", 1)], ["Köln"]
+        )
+        assert _index_page("en", "Die Straße") == ([("die", 1), ("stra", 1), ("e", 1)], [])
+
+    def test_language_mismatch(self, tmp_path, term_index):
+        """Test negative case: an index serves only the language it was built for."""
+        assert term_index.language == "en"
+        dump_path = str(tmp_path / "dump.xml.bz2")
+        assert build_term_index(dump_path, str(tmp_path / "de-index"), processes=1, language="de") == 3
+        german_index = TermIndex(str(tmp_path / "de-index"))
+        assert german_index.language == "de"
+        with pytest.raises(ValueError):
+            PageHandler(Mock(spec=WikiPageFetcher), WikiPageCache(ttl=60), use_cache=False, term_index=german_index)
+        PageHandler(
+            Mock(spec=WikiPageFetcher), WikiPageCache(ttl=60), use_cache=False,
+            term_index=german_index, language="de"
+        )
+        german_index.close()
@@ -0,0 +1,45 @@
+import os
+
+from src.visited import DiskFrontier, ScalableBloomFilter
+
+
+class TestScalableBloomFilter:
+    """Test cases for ScalableBloomFilter class."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.bloom_filter = ScalableBloomFilter(error_rate=0.01, initial_capacity=1000)
+
+    def test_no_false_negatives_when_growing(self):
+        """Test case: added titles are always found, past the initial capacity."""
+        titles = [f"Page {number}" for number in range(5000)]
+        added = sum(self.bloom_filter.add(title) for title in titles)
+        assert added >= 0.99 * len(titles)
+        assert len(self.bloom_filter) == added
+        assert all(title in self.bloom_filter for title in titles)
+        assert not self.bloom_filter.add("Page 1")
+
+    def test_false_positive_rate(self):
+        """Test case: the false positive rate stays below the error rate."""
+        for number in range(5000):
+            self.bloom_filter.add(f"Page {number}")
+        false_positives = sum(f"Other {number}" in self.bloom_filter for number in range(20000))
+        assert false_positives / 20000 <= 0.01
+
+
+class TestDiskFrontier:
+    """Test cases for DiskFrontier class."""
+
+    def test_spills_to_disk(self):
+        """Test case: titles over the memory limit are spilled and iterated in order."""
+        titles = [f"Page {number}" for number in range(25)]
+        frontier = DiskFrontier(titles[:5], memory_limit=10)
+        for title in titles[5:]:
+            frontier.append(title)
+        assert len(frontier) == 25
+        assert frontier._spill is not None
+        spill_path = frontier._spill.name
+        assert list(frontier) == titles
+        assert list(frontier) == titles
+        frontier.close()
+        assert not os.path.exists(spill_path)
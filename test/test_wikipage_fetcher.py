@@ -1,7 +1,12 @@
-from unittest.mock import Mock
+import multiprocessing
+from time import monotonic
+from unittest.mock import Mock, patch
+
+import pytest
 import wikipediaapi
+from prometheus_client import REGISTRY
 
-from src.wikipage_fetcher import WikiPageFetcher
+from src.wikipage_fetcher import RateLimiter, SharedRateLimiter, WikiPageFetcher
 
 
 class TestWikiPageFetcher:
@@ -47,6 +52,26 @@ class TestWikiPageFetcher:
         assert result is None
         self.mock_wiki_api.page.assert_called_once_with(page_name)
 
+    def test_fetch_page_upstream_errors_counted(self):
+        """Test upstream errors raised by the lazy page are counted as errors."""
+        def errors():
+            return REGISTRY.get_sample_value(
+                "word_frequency_upstream_requests_total", {"outcome": "error"}
+            ) or 0
+
+        before = errors()
+        mock_page = Mock(spec=wikipediaapi.WikipediaPage)
+        mock_page.exists.side_effect = ConnectionError("Network timeout")
+        self.mock_wiki_api.page.return_value = mock_page
+        assert self.fetcher.fetch_page("Python") is None
+
+        failing_page = Mock(spec=wikipediaapi.WikipediaPage)
+        failing_page.exists.return_value = True
+        type(failing_page).text = property(Mock(side_effect=ConnectionError("Network timeout")))
+        self.mock_wiki_api.page.return_value = failing_page
+        assert self.fetcher.fetch_page("Python") is None
+        assert errors() == before + 2
+
     def test_fetch_page_network_error(self):
         """Test page fetch when network error occurs."""
         page_name = "NetworkErrorPage"
@@ -127,3 +152,58 @@ class TestWikiPageFetcher:
         assert result1 == result2
         assert self.mock_wiki_api.page.call_count == 2
         self.mock_wiki_api.page.assert_called_with(page_name)
+
+    def test_upstream_requests_rate_limited(self):
+        """Test every upstream HTTP request waits for the rate limiter."""
+        requests = pytest.importorskip("requests")
+        rate_limiter = Mock(spec=RateLimiter)
+        self.mock_wiki_api._session = requests.Session()
+        WikiPageFetcher(self.mock_wiki_api, rate_limiter=rate_limiter)
+        url = "https://en.wikipedia.org/w/api.php"
+        adapter = self.mock_wiki_api._session.get_adapter(url)
+        with patch("requests.adapters.HTTPAdapter.send") as send:
+            for prop in ("info", "extracts", "links"):
+                adapter.send(requests.Request("GET", url, params={"prop": prop}).prepare())
+        assert send.call_count == 3
+        assert rate_limiter.acquire.call_count == 3
+
+
+class TestRateLimiter:
+    """Test cases for RateLimiter class."""
+
+    def test_calls_are_spaced(self):
+        """Test calls over the rate wait for their slot."""
+        rate_limiter = RateLimiter(max_per_second=10)
+        with patch("src.wikipage_fetcher.sleep") as mock_sleep, \
+                patch("src.wikipage_fetcher.monotonic", return_value=100.0):
+            rate_limiter._next_slot = 100.0
+            for _ in range(3):
+                rate_limiter.acquire()
+        assert [call.args[0] for call in mock_sleep.call_args_list] == pytest.approx([0.1, 0.2])
+
+
+class TestSharedRateLimiter:
+    """Test cases for SharedRateLimiter class."""
+
+    def test_limiters_share_slots(self, tmp_path):
+        """Test limiters of the same file, like worker processes, space their calls together."""
+        path = str(tmp_path / "en.slot")
+        first, second = SharedRateLimiter(10, path), SharedRateLimiter(10, path)
+        with patch("src.wikipage_fetcher.sleep") as mock_sleep:
+            first.acquire()
+            second.acquire()
+            first.acquire()
+        waits = [call.args[0] for call in mock_sleep.call_args_list]
+        assert waits == [pytest.approx(0.1, abs=0.05), pytest.approx(0.2, abs=0.05)]
+
+    def test_forked_process_shares_slots(self, tmp_path):
+        """Test a forked process reopens the file and takes the next slot."""
+        limiter = SharedRateLimiter(5, str(tmp_path / "en.slot"))
+        limiter.acquire()
+        context = multiprocessing.get_context("fork")
+        process = context.Process(target=limiter.acquire)
+        started_at = monotonic()
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+        assert monotonic() - started_at >= 0.15
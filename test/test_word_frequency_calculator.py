@@ -44,3 +44,43 @@ class TestWikiPageFetcher:
         """Test omit numbers."""
         result = self.calculator.calculate_word_frequency("23 test 123.")
         assert result == Counter({"test": 1})
+
+    def test_accented_words(self):
+        """Test with accented letters in a Latin script language."""
+        result = self.calculator.calculate_word_frequency("Café crème, café 2024.", language="fr")
+        assert result == Counter({"café": 2, "crème": 1})
+
+    def test_cyrillic_words(self):
+        """Test with a non-Latin script separated by spaces."""
+        result = self.calculator.calculate_word_frequency("Привет мир, привет!", language="ru")
+        assert result == Counter({"привет": 2, "мир": 1})
+
+    def test_japanese_script_runs(self):
+        """Test with a language written without spaces."""
+        result = self.calculator.calculate_word_frequency("東京はニッポンの首都です。", language="ja")
+        assert result == Counter({"東京": 1, "は": 1, "ニッポン": 1, "の": 1, "首都": 1, "です": 1})
+
+    def test_devanagari_combining_marks(self):
+        """Test with vowel signs and viramas kept inside Hindi words."""
+        result = self.calculator.calculate_word_frequency("हिन्दी भाषा, हिन्दी।", language="hi")
+        assert result == Counter({"हिन्दी": 2, "भाषा": 1})
+
+    def test_tamil_combining_marks(self):
+        """Test with spacing combining marks kept inside Tamil words."""
+        result = self.calculator.calculate_word_frequency("தமிழ் மொழி தமிழ்", language="ta")
+        assert result == Counter({"தமிழ்": 2, "மொழி": 1})
+
+    def test_arabic_diacritics(self):
+        """Test with vocalized and unvocalized Arabic words."""
+        result = self.calculator.calculate_word_frequency("اَللُّغَةُ العربية، العربية", language="ar")
+        assert result == Counter({"اَللُّغَةُ": 1, "العربية": 2})
+
+    def test_chinese_bigrams(self):
+        """Test with Chinese clauses counted as character bigrams."""
+        result = self.calculator.calculate_word_frequency("中国是国家。中国", language="zh")
+        assert result == Counter({"中国": 2, "国是": 1, "是国": 1, "国家": 1})
+
+    def test_chinese_single_character(self):
+        """Test with a single Han character between punctuation."""
+        result = self.calculator.calculate_word_frequency("是，", language="zh")
+        assert result == Counter({"是": 1})